@@ -0,0 +1,188 @@
+# api/cache.py
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TieredCache:
+    """
+    Two-tier TTL cache for API responses: an in-memory LRU in front of a
+    persistent SQLite table.
+
+    Every entry carries two deadlines. Until ``fresh_until`` it is served as is;
+    between ``fresh_until`` and ``stale_until`` it is still served but reported
+    as stale so the caller can revalidate it in the background. A deadline of
+    None means the entry never expires.
+
+    SQLite is only touched from one background thread: disk reads on a memory
+    miss are awaited there by ``aget``, and writes and deletes are queued to it
+    (write-behind), so the event loop never blocks on disk I/O or commits.
+    """
+
+    def __init__(self, max_entries=1024, db_path=None):
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._disk = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute("""
+                    CREATE TABLE IF NOT EXISTS api_cache (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        fresh_until REAL,
+                        stale_until REAL
+                    )
+                """)
+                self._db.commit()
+                self._disk = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-cache")
+            except (OSError, sqlite3.Error) as e:
+                print(f"Persistent API cache disabled ({db_path}): {e}")
+                self._db = None
+
+    @staticmethod
+    def make_key(endpoint, ticker, params):
+        """
+        Build a cache key from the endpoint, ticker and request parameters (minus the API key).
+        """
+        parts = [f"{k}={params[k]}" for k in sorted(params) if k != "apikey"]
+        return f"{endpoint}|{str(ticker).upper()}|{'&'.join(parts)}"
+
+    @staticmethod
+    def _state(fresh_until, stale_until, now):
+        if fresh_until is None or now < fresh_until:
+            return "fresh"
+        if stale_until is None or now < stale_until:
+            return "stale"
+        return None
+
+    def get(self, key):
+        """
+        Look up a key in memory, then on disk (blocking; async callers use aget).
+
+        Returns:
+            tuple: (value, state) where state is "fresh", "stale" or None on a miss.
+        """
+        entry = self._memory_entry(key)
+        if entry is None and self._db is not None:
+            entry = self._load(key)
+        return self._serve(key, entry)
+
+    async def aget(self, key):
+        """
+        Async get: a memory miss is looked up on disk in the cache's background thread.
+        """
+        entry = self._memory_entry(key)
+        if entry is None and self._db is not None:
+            entry = await asyncio.get_running_loop().run_in_executor(self._disk, self._load, key)
+        return self._serve(key, entry)
+
+    def set(self, key, value, ttl, stale_ttl=0):
+        """
+        Store a value in memory now and on disk in the background.
+
+        Args:
+            key (str): Cache key from make_key.
+            value: JSON-serializable response payload.
+            ttl (float or None): Seconds the value stays fresh; None never expires.
+            stale_ttl (float): Extra seconds the value may be served stale while revalidating.
+        """
+        now = time.time()
+        fresh_until = None if ttl is None else now + ttl
+        stale_until = None if ttl is None else fresh_until + stale_ttl
+        with self._lock:
+            self._remember(key, (value, fresh_until, stale_until))
+        if self._db is not None:
+            self._disk.submit(self._store, key, json.dumps(value), fresh_until, stale_until)
+
+    def _memory_entry(self, key):
+        with self._lock:
+            return self._memory.get(key)
+
+    def _serve(self, key, entry):
+        now = time.time()
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None, None
+
+            value, fresh_until, stale_until = entry
+            state = self._state(fresh_until, stale_until, now)
+            if state is None:
+                self._memory.pop(key, None)
+                if self._db is not None:
+                    self._disk.submit(self._delete, key)
+                self.misses += 1
+                return None, None
+            if key in self._memory:
+                self._memory.move_to_end(key)
+            if state == "fresh":
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return value, state
+
+    def _load(self, key):
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, fresh_until, stale_until FROM api_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if not row:
+            return None
+        entry = (json.loads(row[0]), row[1], row[2])
+        with self._lock:
+            self._remember(key, entry)
+        return entry
+
+    def _store(self, key, payload, fresh_until, stale_until):
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO api_cache (key, value, fresh_until, stale_until) VALUES (?, ?, ?, ?)",
+                    (key, payload, fresh_until, stale_until),
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Error writing API cache entry: {e}")
+
+    def _delete(self, key):
+        try:
+            with self._db_lock:
+                self._db.execute("DELETE FROM api_cache WHERE key = ?", (key,))
+                self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Error deleting API cache entry: {e}")
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def flush(self):
+        """
+        Wait until queued disk writes have been committed.
+        """
+        if self._disk is not None:
+            self._disk.submit(lambda: None).result()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+            "persistent": self._db is not None,
+        }
@@ -1,151 +1,234 @@
 # api/endpoints.py
+import asyncio
 import httpx
 import os
+from datetime import date as date_cls
+from .cache import TieredCache
+from .singleflight import SingleFlight
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx when installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+DAY = 24 * 60 * 60
+
+# Freshness policy per endpoint: (seconds fresh, extra seconds served stale while revalidating)
+CACHE_TTLS = {
+    "quote-short": (15, 60),
+    "profile": (60 * 60, DAY),
+    "income-statement": (DAY, 7 * DAY),
+    "balance-sheet-statement": (DAY, 7 * DAY),
+    "cash-flow-statement": (DAY, 7 * DAY),
+    "ratios": (DAY, 7 * DAY),
+    "key-metrics": (DAY, 7 * DAY),
+    "historical-price-full": (60 * 60, DAY),
+}
+
 
 class FMPEndpoints:
+    # One pooled client per process (and event loop), shared by every instance,
+    # so modules can keep constructing FMPEndpoints() without paying TCP/TLS setup
+    _client = None
+    _client_loop = None
+    _semaphore = None
+    _cache = None
+    _refreshing = set()
+    _background = set()
+    # Identical concurrent misses share one upstream request
+    _flight = SingleFlight("fmp")
+
+    max_connections = int(os.getenv("FMP_MAX_CONNECTIONS", "20"))
+    max_keepalive_connections = int(os.getenv("FMP_MAX_KEEPALIVE", "10"))
+    max_concurrency = int(os.getenv("FMP_MAX_CONCURRENCY", "10"))
+    timeout = float(os.getenv("FMP_TIMEOUT", "10"))
+
     def __init__(self):
         # self.db = FinancialDB()
         self.fmp_api_key = os.getenv("FMP_API_KEY")
         # print(self.fmp_api_key)
         self.base_url = "https://financialmodelingprep.com/api/v3"
 
-    async def get_income_statement(self, ticker, year=None, period="annual", limit=1):
+    @classmethod
+    def get_client(cls):
+        """
+        Return the shared AsyncClient, creating it for the running event loop if needed.
+        """
+        loop = asyncio.get_running_loop()
+        if cls._client is None or cls._client.is_closed or cls._client_loop is not loop:
+            cls._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=cls.timeout,
+                limits=httpx.Limits(
+                    max_connections=cls.max_connections,
+                    max_keepalive_connections=cls.max_keepalive_connections,
+                ),
+            )
+            cls._client_loop = loop
+            # Caps in-flight upstream requests independently of the pool size
+            cls._semaphore = asyncio.Semaphore(cls.max_concurrency)
+        return cls._client
+
+    @classmethod
+    async def aclose(cls):
+        """
+        Close the shared client and flush queued cache writes. Called from the app's shutdown hook.
+        """
+        if cls._client is not None and not cls._client.is_closed:
+            await cls._client.aclose()
+        if cls._cache is not None:
+            await asyncio.to_thread(cls._cache.flush)
+        cls._client = None
+        cls._client_loop = None
+        cls._semaphore = None
+
+    @classmethod
+    def get_cache(cls):
         """
-        Fetch income statement data for a given ticker.
+        Return the shared response cache (memory LRU backed by SQLite at FMP_CACHE_PATH).
         """
-        endpoint = f"{self.base_url}/income-statement/{ticker}"
-        params = {"apikey": self.fmp_api_key, "period": period, "limit": limit}
-        if year:
-            params["year"] = year
+        if cls._cache is None:
+            cls._cache = TieredCache(
+                max_entries=int(os.getenv("FMP_CACHE_SIZE", "1024")),
+                db_path=os.getenv("FMP_CACHE_PATH", "/app/db/fmp_cache.db") or None,
+            )
+        return cls._cache
+
+    @classmethod
+    def stats(cls):
+        """
+        Report cache and request-coalescing counters.
+        """
+        return {
+            "cache": cls.get_cache().stats(),
+            "singleflight": cls._flight.stats(),
+        }
+
+    @staticmethod
+    def _ttl(name, params):
+        ttl, stale_ttl = CACHE_TTLS.get(name, (0, 0))
+        if name == "historical-price-full" and params.get("to"):
+            # Prices for days that have closed never change
+            try:
+                if date_cls.fromisoformat(str(params["to"])) < date_cls.today():
+                    return None, 0
+            except ValueError:
+                pass
+        return ttl, stale_ttl
+
+    async def _get(self, name, ticker, params, description):
+        """
+        Serve a request from the cache, revalidating stale entries in the background,
+        and fall back to the API on a miss.
+        """
+        cache = self.get_cache()
+        key = cache.make_key(name, ticker, params)
+        value, state = await cache.aget(key)
+        if state == "stale" and key not in self._refreshing:
+            self._refreshing.add(key)
+            task = asyncio.create_task(self._revalidate(key, name, ticker, params, description))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        if state is not None:
+            return value
+        return await self._flight.do(key, lambda: self._fetch_and_store(key, name, ticker, params, description))
+
+    async def _revalidate(self, key, name, ticker, params, description):
         try:
-            async with httpx.AsyncClient() as client:
+            await self._flight.do(key, lambda: self._fetch_and_store(key, name, ticker, params, description))
+        except Exception as e:
+            print(f"Background refresh failed for {key}: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    async def _fetch_and_store(self, key, name, ticker, params, description):
+        data = await self._request(f"{self.base_url}/{name}/{ticker}", params, description)
+        # Only cache usable payloads; empty results and error bodies are retried next time
+        if data and not (isinstance(data, dict) and "Error Message" in data):
+            ttl, stale_ttl = self._ttl(name, params)
+            if ttl is None or ttl > 0:
+                self.get_cache().set(key, data, ttl, stale_ttl)
+        return data
+
+    async def _request(self, endpoint, params, description):
+        client = self.get_client()
+        try:
+            async with self._semaphore:
                 response = await client.get(endpoint, params=params)
-                response.raise_for_status()
-                return response.json()
+            response.raise_for_status()
+            return response.json()
         except httpx.HTTPStatusError as e:
             raise Exception(f"API error: {e.response.status_code} - {e.response.text}")
         except Exception as e:
-            raise Exception(f"Error fetching income statement: {e}")
+            raise Exception(f"Error fetching {description}: {e}")
+
+    async def get_income_statement(self, ticker, year=None, period="annual", limit=1):
+        """
+        Fetch income statement data for a given ticker.
+        """
+        params = {"apikey": self.fmp_api_key, "period": period, "limit": limit}
+        if year:
+            params["year"] = year
+        return await self._get("income-statement", ticker, params, "income statement")
 
     async def get_quote_short(self, ticker):
         """
         Fetch the current stock price (short quote) for a given ticker.
         """
-        endpoint = f"{self.base_url}/quote-short/{ticker}"
         params = {"apikey": self.fmp_api_key}
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(endpoint, params=params)
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            raise Exception(f"API error: {e.response.status_code} - {e.response.text}")
-        except Exception as e:
-            raise Exception(f"Error fetching quote: {e}")
+        return await self._get("quote-short", ticker, params, "quote")
 
     async def get_ratios(self, ticker, year=None, limit=1):
         """
         Fetch financial ratios for a given ticker.
         """
-        endpoint = f"{self.base_url}/ratios/{ticker}"
         params = {"apikey": self.fmp_api_key, "limit": limit}
         if year:
             params["year"] = year
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(endpoint, params=params)
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            raise Exception(f"API error: {e.response.status_code} - {e.response.text}")
-        except Exception as e:
-            raise Exception(f"Error fetching ratios: {e}")
+        return await self._get("ratios", ticker, params, "ratios")
 
     async def get_profile(self, ticker):
         """
         Fetch company profile data for a given ticker.
         """
-        endpoint = f"{self.base_url}/profile/{ticker}"
         params = {"apikey": self.fmp_api_key}
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(endpoint, params=params)
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            raise Exception(f"API error: {e.response.status_code} - {e.response.text}")
-        except Exception as e:
-            raise Exception(f"Error fetching profile: {e}")
+        return await self._get("profile", ticker, params, "profile")
 
     async def get_historical_price(self, ticker, date=None):
         """
         Fetch historical stock price for a given ticker on a specific date.
         """
-        endpoint = f"{self.base_url}/historical-price-full/{ticker}"
         params = {"apikey": self.fmp_api_key}
         if date:
             params["from"] = date
             params["to"] = date
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(endpoint, params=params)
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            raise Exception(f"API error: {e.response.status_code} - {e.response.text}")
-        except Exception as e:
-            raise Exception(f"Error fetching historical price: {e}")
+        return await self._get("historical-price-full", ticker, params, "historical price")
 
     async def get_balance_sheet(self, ticker, year=None, period="annual", limit=1):
         """
         Fetch balance sheet data for a given ticker.
         """
-        endpoint = f"{self.base_url}/balance-sheet-statement/{ticker}"
         params = {"apikey": self.fmp_api_key, "period": period, "limit": limit}
         if year:
             params["year"] = year
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(endpoint, params=params)
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            raise Exception(f"API error: {e.response.status_code} - {e.response.text}")
-        except Exception as e:
-            raise Exception(f"Error fetching balance sheet: {e}")
+        return await self._get("balance-sheet-statement", ticker, params, "balance sheet")
 
     async def get_cash_flow(self, ticker, year=None, period="annual", limit=1):
         """
         Fetch cash flow statement data for a given ticker.
         """
-        endpoint = f"{self.base_url}/cash-flow-statement/{ticker}"
         params = {"apikey": self.fmp_api_key, "period": period, "limit": limit}
         if year:
             params["year"] = year
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(endpoint, params=params)
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            raise Exception(f"API error: {e.response.status_code} - {e.response.text}")
-        except Exception as e:
-            raise Exception(f"Error fetching cash flow: {e}")
+        return await self._get("cash-flow-statement", ticker, params, "cash flow")
 
     async def get_key_metrics(self, ticker, year=None, limit=1):
         """
         Fetch key metrics (e.g., EPS) for a given ticker.
         """
-        endpoint = f"{self.base_url}/key-metrics/{ticker}"
         params = {"apikey": self.fmp_api_key, "limit": limit}
         if year:
             params["year"] = year
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(endpoint, params=params)
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            raise Exception(f"API error: {e.response.status_code} - {e.response.text}")
-        except Exception as e:
-            raise Exception(f"Error fetching key metrics: {e}")
\ No newline at end of file
+        return await self._get("key-metrics", ticker, params, "key metrics")
@@ -0,0 +1,56 @@
+# api/singleflight.py
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent async calls into one upstream call.
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it is in flight await the same task instead of starting their own.
+    The task is shielded, so a cancelled caller never cancels the shared work.
+    """
+
+    def __init__(self, name=""):
+        self.name = name
+        self._inflight = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        """
+        Run ``fn()`` once per key among concurrent callers.
+
+        Args:
+            key (hashable): Identity of the request.
+            fn (callable): Zero-argument function returning an awaitable.
+
+        Returns:
+            The result of the shared call (or raises its exception).
+        """
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
@@ -1,21 +1,36 @@
-from fastapi import FastAPI, Request, Form, File, UploadFile
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, Request, Form, File, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from main import process_query
-from voice.speech_to_text import SpeechToText
-import os
+from contextlib import asynccontextmanager
+from main import process_query, process_batch, parse_questions
+from registry import registry
+from api.endpoints import FMPEndpoints
+from voice.transcription_service import TranscriptionQueueFull
+from voice.audio_decode import adecode_to_pcm, upload_pcm, AudioDecodeError
+import asyncio
+import json
 import logging
-import tempfile
-import shutil
-import wave
-from pydub import AudioSegment
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the shared components in a worker thread so the server can answer
+    # /ready (and /query, which loads lazily) while the models are loading
+    warm_up_task = asyncio.create_task(asyncio.to_thread(registry.warm_up))
+    yield
+    if not warm_up_task.done():
+        warm_up_task.cancel()
+    # Release pooled keep-alive connections to the FMP API
+    await FMPEndpoints.aclose()
+    registry.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Mount static files (for CSS, JS, etc.)
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -24,95 +39,83 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 
-# Vosk model path
-vosk_model_path = "./vosk-model-small-en-us-0.15"
-
-# Initialize SpeechToText
-stt = SpeechToText(model_path=vosk_model_path)
-
-def is_valid_wav(file_path):
-    """Check if the file is a valid WAV file."""
-    try:
-        with wave.open(file_path, 'rb') as wf:
-            logger.info(f"WAV file validated: channels={wf.getnchannels()}, rate={wf.getframerate()}, frames={wf.getnframes()}")
-            return True
-    except wave.Error as e:
-        logger.error(f"Invalid WAV file: {str(e)}")
-        return False
-
-def convert_to_wav(input_path, output_path):
-    """Convert input audio to WAV format (16kHz, mono, 16-bit PCM)."""
-    try:
-        audio = AudioSegment.from_file(input_path)
-        audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)  # 16-bit PCM
-        audio.export(output_path, format="wav")
-        logger.info(f"Converted audio to WAV: {output_path}, size: {os.path.getsize(output_path)} bytes")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to convert audio to WAV: {str(e)}")
-        return False
-
 @app.get("/", response_class=HTMLResponse)
 async def get_index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
+@app.get("/ready")
+async def readiness():
+    """Report healthy only once the component warm-up has finished."""
+    status = registry.status()
+    return JSONResponse(status, status_code=200 if status["status"] == "ready" else 503)
+
+@app.get("/stats")
+async def stats():
+    """Expose cache, request-coalescing and pipeline counters."""
+    return JSONResponse(registry.stats())
+
 @app.post("/upload_audio", response_class=HTMLResponse)
 async def upload_audio(request: Request, audio_file: UploadFile = File(...)):
-    # Use a temporary directory to store the uploaded audio file
     try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Save the uploaded file (could be WebM, OGG, etc.)
-            input_file_path = os.path.join(temp_dir, "input_audio.webm")
-            with open(input_file_path, "wb") as buffer:
-                shutil.copyfileobj(audio_file.file, buffer)
-                file_size = os.path.getsize(input_file_path) if os.path.exists(input_file_path) else 0
-                logger.info(f"Uploaded audio saved to {input_file_path}, size: {file_size} bytes")
-
-            # Verify file was saved
-            if not os.path.exists(input_file_path) or file_size == 0:
-                logger.error("Uploaded audio file was not saved correctly")
-                return templates.TemplateResponse("index.html", {
-                    "request": request,
-                    "error": "Failed to save uploaded audio file."
-                })
-
-            # Convert to WAV
-            wav_file_path = os.path.join(temp_dir, "temp_audio.wav")
-            if not convert_to_wav(input_file_path, wav_file_path):
-                logger.error("Audio conversion to WAV failed")
-                return templates.TemplateResponse("index.html", {
-                    "request": request,
-                    "error": "Failed to convert audio to WAV format."
-                })
-
-            # Validate WAV file
-            if not is_valid_wav(wav_file_path):
-                logger.error("Converted file is not a valid WAV file")
-                return templates.TemplateResponse("index.html", {
-                    "request": request,
-                    "error": "Converted audio is not a valid WAV file."
-                })
-
-            # Transcribe the WAV file
+        # Keep the upload (could be WebM, OGG, etc.) in memory
+        data = await audio_file.read()
+        logger.info(f"Uploaded audio received, size: {len(data)} bytes")
+        if not data:
+            logger.error("Uploaded audio file is empty")
+            return templates.TemplateResponse("index.html", {
+                "request": request,
+                "error": "Uploaded audio file is empty."
+            })
+
+        # The web UI sends 16 kHz mono 16-bit WAV, which needs no conversion;
+        # anything else is decoded to that format through one ffmpeg pipe
+        pcm = upload_pcm(data, audio_file.content_type)
+        if pcm is not None:
+            logger.info("Uploaded audio is 16 kHz mono PCM, skipping ffmpeg")
+        else:
             try:
-                text = stt.transcribe_audio(wav_file_path)
-                logger.info(f"Transcription result: '{text}'")
-                if not text:
-                    logger.warning("Transcription returned no text")
-                    return templates.TemplateResponse("index.html", {
-                        "request": request,
-                        "error": "Could not understand the audio. Please try speaking clearly."
-                    })
+                pcm = await adecode_to_pcm(data)
+            except AudioDecodeError as e:
+                logger.error(f"Audio decoding failed: {str(e)}")
                 return templates.TemplateResponse("index.html", {
                     "request": request,
-                    "transcribed_text": text
+                    "error": "Failed to decode the uploaded audio."
                 })
-            except Exception as e:
-                logger.error(f"Transcription error: {str(e)}")
+        if not pcm:
+            logger.error("Decoded audio contains no samples")
+            return templates.TemplateResponse("index.html", {
+                "request": request,
+                "error": "Uploaded audio contains no sound."
+            })
+        logger.info(f"Decoded audio: {len(pcm) // 2} samples at 16000 Hz")
+
+        # Transcribe the PCM on the recognizer pool, off the event loop
+        try:
+            transcriber = await asyncio.to_thread(lambda: registry.transcriber)
+            text = await transcriber.transcribe_pcm(pcm, 16000)
+            logger.info(f"Transcription result: '{text}'")
+            if not text:
+                logger.warning("Transcription returned no text")
                 return templates.TemplateResponse("index.html", {
                     "request": request,
-                    "error": f"Transcription error: {str(e)}"
+                    "error": "Could not understand the audio. Please try speaking clearly."
                 })
+            return templates.TemplateResponse("index.html", {
+                "request": request,
+                "transcribed_text": text
+            })
+        except TranscriptionQueueFull as e:
+            logger.warning(f"Transcription rejected: {str(e)}")
+            return templates.TemplateResponse("index.html", {
+                "request": request,
+                "error": "The speech recognizer is busy. Please try again in a moment."
+            }, status_code=503)
+        except Exception as e:
+            logger.error(f"Transcription error: {str(e)}")
+            return templates.TemplateResponse("index.html", {
+                "request": request,
+                "error": f"Transcription error: {str(e)}"
+            })
 
     except Exception as e:
         logger.error(f"Error processing uploaded audio: {str(e)}")
@@ -121,10 +124,71 @@ async def upload_audio(request: Request, audio_file: UploadFile = File(...)):
             "error": f"Error processing audio: {str(e)}"
         })
 
+@app.websocket("/ws/transcribe")
+async def transcribe_stream(websocket: WebSocket):
+    """
+    Streaming speech recognition.
+
+    The client sends binary frames of 16 kHz mono s16le PCM while the user speaks
+    (optionally preceded by a text frame {"event": "start", "sample_rate": N}) and
+    a text frame {"event": "end"} when done; add "answer": true to also run the
+    transcript through process_query. The server replies with JSON messages:
+    {"type": "partial"|"final"|"done", "text": ...} and, if requested,
+    {"type": "answer", "result": {...}}.
+    """
+    await websocket.accept()
+    transcriber = await asyncio.to_thread(lambda: registry.transcriber)
+    stt = transcriber.stt
+    session = stt.stream(16000)
+    received_audio = False
+    last_partial = ""
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                received_audio = True
+                kind, text = await transcriber.submit(session.accept, message["bytes"])
+                if kind == "final":
+                    last_partial = ""
+                    if text:
+                        await websocket.send_json({"type": "final", "text": text})
+                elif text and text != last_partial:
+                    last_partial = text
+                    await websocket.send_json({"type": "partial", "text": text})
+            elif message.get("text"):
+                try:
+                    control = json.loads(message["text"])
+                except json.JSONDecodeError:
+                    await websocket.send_json({"type": "error", "error": "Control frames must be JSON."})
+                    continue
+                event = control.get("event")
+                if event == "start" and not received_audio:
+                    session = stt.stream(int(control.get("sample_rate", 16000)))
+                elif event in ("end", "eof"):
+                    text = await transcriber.submit(session.finish)
+                    logger.info(f"Streaming transcription result: '{text}'")
+                    await websocket.send_json({"type": "done", "text": text})
+                    if control.get("answer") and text:
+                        result = await process_query(query_text=text, use_retriever=bool(control.get("use_retriever")))
+                        await websocket.send_json({"type": "answer", "result": result})
+                    await websocket.close()
+                    break
+    except WebSocketDisconnect:
+        logger.info("Transcription client disconnected")
+    except Exception as e:
+        logger.error(f"Streaming transcription error: {str(e)}")
+        try:
+            await websocket.send_json({"type": "error", "error": str(e)})
+            await websocket.close()
+        except Exception:
+            pass
+
 @app.post("/query", response_class=HTMLResponse)
 async def handle_query(request: Request, query_text: str = Form(...), use_retriever: str = Form("no")):
     use_retriever = use_retriever.lower() in ["yes", "y"]
-    result = await process_query(vosk_model_path, query_text=query_text, use_retriever=use_retriever)
+    result = await process_query(query_text=query_text, use_retriever=use_retriever)
 
     return templates.TemplateResponse("index.html", {
         "request": request,
@@ -137,3 +201,32 @@ async def handle_query(request: Request, query_text: str = Form(...), use_retrie
         "Final_Response": result["final_response"],
         "Error": result["error"]
     })
+
+
+@app.post("/query/batch")
+async def handle_batch_query(request: Request, use_retriever: bool = False):
+    """
+    Answer a JSONL file of questions and stream the results back as NDJSON, in input order.
+
+    The JSONL can be the raw request body or a multipart upload in the ``file`` field.
+    """
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None:
+            return JSONResponse({"error": "Missing 'file' field with JSONL questions."}, status_code=400)
+        body = await upload.read()
+    else:
+        body = await request.body()
+
+    try:
+        questions = parse_questions(body.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError) as e:
+        return JSONResponse({"error": f"Invalid JSONL: {e}"}, status_code=400)
+    logger.info(f"Batch query with {len(questions)} questions")
+
+    async def stream_results():
+        async for result in process_batch(questions, use_retriever=use_retriever):
+            yield json.dumps(result, default=str) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
@@ -0,0 +1,65 @@
+# batch_query.py
+"""
+Answer a JSONL file of questions and write NDJSON results in input order.
+
+Usage:
+    python batch_query.py questions.jsonl > answers.jsonl
+    python batch_query.py questions.jsonl -o answers.jsonl --concurrency 16 --use-retriever
+    cat questions.jsonl | python batch_query.py -
+
+Each input line is a JSON string or an object with a "question" field and an
+optional "id". Each output line is the /query output plus the "id".
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from main import process_batch, parse_questions
+from registry import registry
+from api.endpoints import FMPEndpoints
+
+
+async def run(questions, out, use_retriever, concurrency, chunk_size):
+    try:
+        async for result in process_batch(questions, use_retriever=use_retriever,
+                                          concurrency=concurrency, chunk_size=chunk_size):
+            out.write(json.dumps(result, default=str) + "\n")
+            out.flush()
+    finally:
+        await FMPEndpoints.aclose()
+        registry.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of financial questions.")
+    parser.add_argument("input", help="JSONL questions file, or - for stdin")
+    parser.add_argument("-o", "--output", help="NDJSON output file (default: stdout)")
+    parser.add_argument("--use-retriever", action="store_true", help="Also query the CSV store when the API answers")
+    parser.add_argument("--concurrency", type=int, default=None, help="Concurrent lookups (default: BATCH_CONCURRENCY or 8)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Questions per model batch (default: BATCH_CHUNK_SIZE or 32)")
+    args = parser.parse_args()
+
+    if args.input == "-":
+        questions = parse_questions(sys.stdin.read())
+    else:
+        with open(args.input, "r", encoding="utf-8") as f:
+            questions = parse_questions(f.read())
+
+    # The components log progress with print(); keep the real stdout for NDJSON results only
+    results = sys.stdout
+    sys.stdout = sys.stderr
+    out = open(args.output, "w", encoding="utf-8") if args.output else results
+    start = time.perf_counter()
+    try:
+        asyncio.run(run(questions, out, args.use_retriever, args.concurrency, args.chunk_size))
+    finally:
+        if out is not results:
+            out.close()
+    elapsed = time.perf_counter() - start
+    rate = len(questions) / elapsed if elapsed else 0.0
+    print(f"Answered {len(questions)} questions in {elapsed:.1f}s ({rate:.1f}/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
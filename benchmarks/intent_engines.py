@@ -0,0 +1,99 @@
+# benchmarks/intent_engines.py
+"""
+Compare intent engines on a labeled question set.
+
+Usage (from the repository root):
+    python benchmarks/intent_engines.py
+    python benchmarks/intent_engines.py --engines centroid knn --cascade
+
+Each engine is built through ComponentRegistry exactly as the app builds it,
+so model load time is reported separately from per-query latency.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from registry import ComponentRegistry
+
+DEFAULT_QUESTIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_questions.jsonl")
+
+
+def load_questions(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_engine(engine, questions, cascade=False):
+    components = ComponentRegistry(intent_engine=engine)
+    start = time.perf_counter()
+    classifier = components.classifier
+    load_s = time.perf_counter() - start
+    classify = classifier.classify if cascade else classifier.classify_with_llm
+
+    # One untimed call so lazy initialisation does not skew the first sample
+    classify(questions[0]["text"])
+
+    latencies = []
+    correct = 0
+    errors = []
+    for question in questions:
+        start = time.perf_counter()
+        predicted = classify(question["text"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        if predicted == question["intent"]:
+            correct += 1
+        else:
+            errors.append((question["text"], question["intent"], predicted))
+
+    return {
+        "engine": engine + (" +cascade" if cascade else ""),
+        "accuracy": correct / len(questions),
+        "load_s": load_s,
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark intent engines for accuracy and latency.")
+    parser.add_argument("--engines", nargs="+", default=["bart", "distilbert", "centroid", "knn"])
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS, help="JSONL file of {text, intent} records")
+    parser.add_argument("--cascade", action="store_true", help="Measure classify() (keyword cascade) instead of the model alone")
+    parser.add_argument("--show-errors", action="store_true")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    print(f"{len(questions)} labeled questions from {args.questions}\n")
+
+    results = []
+    for engine in args.engines:
+        try:
+            results.append(run_engine(engine, questions, cascade=args.cascade))
+        except Exception as e:
+            print(f"Engine {engine} failed: {e}")
+
+    print(f"{'engine':<22}{'accuracy':>10}{'load s':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for r in results:
+        print(f"{r['engine']:<22}{r['accuracy']:>10.1%}{r['load_s']:>10.1f}{r['mean_ms']:>10.1f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}")
+
+    if args.show_errors:
+        for r in results:
+            print(f"\n{r['engine']} misclassified:")
+            for text, expected, predicted in r["errors"]:
+                print(f"  {text!r}: expected {expected}, got {predicted}")
+
+
+if __name__ == "__main__":
+    main()
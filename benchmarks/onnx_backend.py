@@ -0,0 +1,137 @@
+# benchmarks/onnx_backend.py
+"""
+Compare the PyTorch and ONNX Runtime (int8) backends for each transformer model.
+
+Usage (from the repository root):
+    python benchmarks/onnx_backend.py
+    ORT_INTRA_OP_THREADS=4 python benchmarks/onnx_backend.py --models minilm distilbert
+
+Every (model, backend) pair runs in a fresh process so resident memory is
+measured without the other backend loaded. Zero-shot models are scored for
+intent accuracy on benchmarks/intent_questions.jsonl; the embedder is scored
+by cosine similarity between the two backends' vectors.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+QUESTIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_questions.jsonl")
+ZERO_SHOT_MODELS = {
+    "bart": "facebook/bart-large-mnli",
+    "distilbert": "typeform/distilbert-base-uncased-mnli",
+}
+INTENTS = [
+    "get_net_income", "get_revenue", "get_stock_price", "get_profit_margin",
+    "get_company_profile", "get_market_cap", "get_historical_stock_price", "get_dividend_info",
+    "get_balance_sheet", "get_cash_flow", "get_financial_ratios", "get_earnings_per_share",
+    "get_interest", "get_research_info", "get_cost_info", "get_income_tax",
+]
+
+
+def rss_mb():
+    """
+    Current resident set size in MB (Linux /proc; 0 elsewhere).
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return 0.0
+
+
+def run(model, backend, texts):
+    # Runs in a child process: the backend is chosen by the environment
+    sys.path.insert(0, ROOT)
+    os.environ["INFERENCE_BACKEND"] = backend
+    from inference_backend import load_sentence_encoder, load_zero_shot_pipeline
+
+    base_rss = rss_mb()
+    start = time.perf_counter()
+    if model == "minilm":
+        encoder, resolved = load_sentence_encoder("all-MiniLM-L6-v2")
+        call = lambda text: encoder.encode([text], convert_to_numpy=True)[0]
+    else:
+        kwargs = {"from_pt": True} if model == "bart" else {}
+        classifier = load_zero_shot_pipeline(ZERO_SHOT_MODELS[model], **kwargs)
+        resolved = "onnx" if type(classifier.model).__module__.startswith("optimum") else "torch"
+        template = "This text is requesting {} information."
+        call = lambda text: classifier(text, candidate_labels=INTENTS, hypothesis_template=template)["labels"][0]
+    load_s = time.perf_counter() - start
+
+    call(texts[0])  # warm-up
+    outputs = []
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        outputs.append(call(text))
+        latencies.append((time.perf_counter() - start) * 1000)
+    if model == "minilm":
+        outputs = [vector.tolist() for vector in outputs]
+    return {
+        "backend": resolved,
+        "load_s": load_s,
+        "rss_mb": rss_mb() - base_rss,
+        "mean_ms": statistics.mean(latencies),
+        "p95_ms": sorted(latencies)[int(0.95 * (len(latencies) - 1))],
+        "outputs": outputs,
+    }
+
+
+def in_child(model, backend, texts):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(run, model, backend, texts).result()
+
+
+def cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = (sum(x * x for x in a) ** 0.5) * (sum(y * y for y in b) ** 0.5)
+    return dot / norm if norm else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PyTorch vs ONNX Runtime inference.")
+    parser.add_argument("--models", nargs="+", default=["minilm", "distilbert", "bart"])
+    args = parser.parse_args()
+
+    with open(QUESTIONS, "r", encoding="utf-8") as f:
+        questions = [json.loads(line) for line in f if line.strip()]
+    texts = [q["text"] for q in questions]
+    labels = [q["intent"] for q in questions]
+
+    print(f"{'model':<12}{'backend':<12}{'load s':>8}{'RSS MB':>9}{'mean ms':>9}{'p95 ms':>9}{'speedup':>9}  quality")
+    for model in args.models:
+        results = {}
+        for backend in ("torch", "onnx"):
+            try:
+                results[backend] = in_child(model, backend, texts)
+            except Exception as e:
+                print(f"{model:<12}{backend:<12} failed: {e}")
+        torch_result = results.get("torch")
+        for backend, r in results.items():
+            speedup = torch_result["mean_ms"] / r["mean_ms"] if torch_result else float("nan")
+            if model == "minilm":
+                if torch_result and backend != "torch":
+                    sims = [cosine(a, b) for a, b in zip(torch_result["outputs"], r["outputs"])]
+                    quality = f"cosine vs torch mean {statistics.mean(sims):.4f} min {min(sims):.4f}"
+                else:
+                    quality = "reference"
+            else:
+                accuracy = sum(p == l for p, l in zip(r["outputs"], labels)) / len(labels)
+                quality = f"accuracy {accuracy:.1%}"
+                if torch_result and backend != "torch":
+                    torch_accuracy = sum(p == l for p, l in zip(torch_result["outputs"], labels)) / len(labels)
+                    quality += f" (delta {accuracy - torch_accuracy:+.1%})"
+            print(f"{model:<12}{r['backend']:<12}{r['load_s']:>8.1f}{r['rss_mb']:>9.0f}{r['mean_ms']:>9.1f}{r['p95_ms']:>9.1f}{speedup:>9.2f}  {quality}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/stt_grammar.py
+"""
+Compare open-vocabulary and finance-grammar Vosk decoding on recorded queries.
+
+Usage (from the repository root):
+    python benchmarks/stt_grammar.py --samples recordings/samples.jsonl
+
+The samples file is JSONL with one {"audio": "<path>", "text": "<reference transcript>"}
+per line; audio paths are relative to the samples file. Any format ffmpeg reads
+is accepted. Reports real-time factor (decode time / audio duration) and word
+error rate for:
+    open      open vocabulary only
+    grammar   constrained decoder only
+    cascade   constrained first, open-vocabulary fallback on low confidence (STT_MODE=grammar)
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from voice.audio_decode import load_pcm
+from voice.finance_grammar import build_finance_grammar
+from voice.speech_to_text import SpeechToText
+
+
+def word_errors(reference, hypothesis):
+    """
+    Word-level Levenshtein distance and reference length.
+    """
+    ref = reference.lower().split()
+    hyp = (hypothesis or "").lower().split()
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, start=1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1], len(ref)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark grammar-constrained vs open-vocabulary Vosk decoding.")
+    parser.add_argument("--samples", required=True, help="JSONL file of {audio, text} records")
+    parser.add_argument("--model", default=os.getenv("VOSK_MODEL_PATH", "./vosk-model-small-en-us-0.15"))
+    parser.add_argument("--show", action="store_true", help="Print each hypothesis")
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.abspath(args.samples))
+    with open(args.samples, "r", encoding="utf-8") as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+
+    stt = SpeechToText(args.model, grammar=build_finance_grammar())
+    modes = {
+        "open": lambda pcm: stt.decode_pcm(pcm, constrained=False)[0],
+        "grammar": lambda pcm: stt.decode_pcm(pcm, constrained=True)[0],
+        "cascade": lambda pcm: stt.transcribe_pcm(pcm),
+    }
+    totals = {mode: {"seconds": 0.0, "errors": 0, "words": 0} for mode in modes}
+    audio_seconds = 0.0
+
+    for sample in samples:
+        pcm = load_pcm(os.path.join(base_dir, sample["audio"]))
+        audio_seconds += len(pcm) / 2 / 16000
+        for mode, decode in modes.items():
+            start = time.perf_counter()
+            hypothesis = decode(pcm)
+            totals[mode]["seconds"] += time.perf_counter() - start
+            errors, words = word_errors(sample["text"], hypothesis)
+            totals[mode]["errors"] += errors
+            totals[mode]["words"] += words
+            if args.show:
+                print(f"[{mode:<7}] {sample['audio']}: {hypothesis!r}")
+
+    print(f"\n{len(samples)} samples, {audio_seconds:.1f}s of audio")
+    print(f"{'mode':<10}{'RTF':>8}{'WER':>9}")
+    for mode, t in totals.items():
+        rtf = t["seconds"] / audio_seconds if audio_seconds else 0.0
+        wer = t["errors"] / t["words"] if t["words"] else 0.0
+        print(f"{mode:<10}{rtf:>8.3f}{wer:>9.1%}")
+    print(f"cascade fallbacks to open vocabulary: {stt.grammar_stats['fallbacks']}/{stt.grammar_stats['constrained']}")
+
+
+if __name__ == "__main__":
+    main()
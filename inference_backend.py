@@ -0,0 +1,191 @@
+# inference_backend.py
+import json
+import os
+import numpy as np
+
+# INFERENCE_BACKEND=onnx exports the transformer models to ONNX once, applies
+# int8 dynamic quantization (unless ORT_QUANTIZE=0) and runs them with ONNX
+# Runtime. Anything that fails falls back to the PyTorch models.
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", "/app/cache/onnx")
+
+
+def backend_name():
+    """
+    Return the configured backend: "onnx" or "torch".
+    """
+    return "onnx" if os.getenv("INFERENCE_BACKEND", "torch").lower() == "onnx" else "torch"
+
+
+def quantize_enabled():
+    return os.getenv("ORT_QUANTIZE", "1").lower() not in ("0", "false", "no")
+
+
+def require_onnx():
+    """
+    Raise ImportError with install instructions if the optional ONNX packages are missing.
+    """
+    try:
+        import onnxruntime  # noqa: F401
+        import optimum.onnxruntime  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            f"INFERENCE_BACKEND=onnx needs the optional ONNX packages ({e.name} is missing); "
+            "install them with `pip install -r requirements-onnx.txt`."
+        ) from e
+
+
+def session_options():
+    """
+    Build ONNX Runtime session options with full graph optimization and the
+    thread counts from ORT_INTRA_OP_THREADS / ORT_INTER_OP_THREADS.
+    """
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    intra = int(os.getenv("ORT_INTRA_OP_THREADS", "0"))
+    inter = int(os.getenv("ORT_INTER_OP_THREADS", "1"))
+    if intra > 0:
+        options.intra_op_num_threads = intra
+    options.inter_op_num_threads = inter
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    return options
+
+
+def _quantization_config():
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    arch = os.getenv("ORT_QUANT_ARCH", "avx2").lower()
+    if arch == "arm64":
+        return AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+    if arch == "avx512":
+        return AutoQuantizationConfig.avx512(is_static=False, per_channel=False)
+    if arch == "avx512_vnni":
+        return AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    return AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+
+
+def export_onnx_model(model_id, model_class, quantize=None, cache_dir=None):
+    """
+    Export a Hugging Face model to ONNX (optionally int8-quantized) and load it.
+
+    The exported files are kept in ``<cache_dir>/<model_id>[-int8]`` so the export
+    and quantization cost is paid once, not on every start.
+
+    Args:
+        model_id (str): Hugging Face model id.
+        model_class: optimum ORTModel class, e.g. ORTModelForSequenceClassification.
+        quantize (bool, optional): Apply dynamic int8 quantization. Defaults to ORT_QUANTIZE.
+        cache_dir (str, optional): Export directory. Defaults to ONNX_CACHE_DIR.
+
+    Returns:
+        tuple: (ORTModel, tokenizer, export directory)
+    """
+    require_onnx()
+    from transformers import AutoTokenizer
+
+    quantize = quantize_enabled() if quantize is None else quantize
+    cache_dir = cache_dir or ONNX_CACHE_DIR
+    export_dir = os.path.join(cache_dir, model_id.replace("/", "--"))
+    target_dir = export_dir + "-int8" if quantize else export_dir
+    file_name = "model_quantized.onnx" if quantize else "model.onnx"
+
+    if not os.path.exists(os.path.join(target_dir, file_name)):
+        print(f"Exporting {model_id} to ONNX in {export_dir}...")
+        model = model_class.from_pretrained(model_id, export=True)
+        model.save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(model_id).save_pretrained(export_dir)
+        if quantize:
+            from optimum.onnxruntime import ORTQuantizer
+
+            quantizer = ORTQuantizer.from_pretrained(export_dir)
+            quantizer.quantize(save_dir=target_dir, quantization_config=_quantization_config())
+            AutoTokenizer.from_pretrained(export_dir).save_pretrained(target_dir)
+
+    model = model_class.from_pretrained(target_dir, file_name=file_name, session_options=session_options())
+    tokenizer = AutoTokenizer.from_pretrained(target_dir)
+    print(f"Loaded ONNX model {model_id} from {target_dir}")
+    return model, tokenizer, target_dir
+
+
+def load_zero_shot_pipeline(model_id, **torch_kwargs):
+    """
+    Return a zero-shot-classification pipeline on the configured backend.
+
+    With INFERENCE_BACKEND=onnx the pipeline wraps an ONNX Runtime model, so
+    callers keep using ``pipeline(text, candidate_labels=...)`` unchanged.
+    """
+    from transformers import pipeline
+
+    if backend_name() == "onnx":
+        try:
+            require_onnx()
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+
+            model, tokenizer, _ = export_onnx_model(model_id, ORTModelForSequenceClassification)
+            return pipeline("zero-shot-classification", model=model, tokenizer=tokenizer)
+        except Exception as e:
+            print(f"ONNX backend unavailable for {model_id}: {e}. Falling back to PyTorch.")
+    return pipeline("zero-shot-classification", model=model_id, **torch_kwargs)
+
+
+class OnnxSentenceEncoder:
+    """
+    ONNX Runtime replacement for ``SentenceTransformer.encode``.
+
+    Runs the exported transformer and applies the mean pooling (and L2
+    normalization, when the sentence-transformers config includes it) that the
+    original model's modules.json describes.
+    """
+
+    def __init__(self, model_name, batch_size=32):
+        require_onnx()
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+
+        model_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        self.model, self.tokenizer, _ = export_onnx_model(model_id, ORTModelForFeatureExtraction)
+        self.batch_size = batch_size
+        self.normalize = self._uses_normalize(model_id)
+
+    @staticmethod
+    def _uses_normalize(model_id):
+        try:
+            from huggingface_hub import hf_hub_download
+
+            with open(hf_hub_download(model_id, "modules.json"), "r", encoding="utf-8") as f:
+                return any(module.get("type", "").endswith("Normalize") for module in json.load(f))
+        except Exception as e:
+            print(f"Could not read sentence-transformers config for {model_id}: {e}")
+            return False
+
+    def encode(self, texts, convert_to_numpy=True, batch_size=None):
+        batch_size = batch_size or self.batch_size
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            batch = self.tokenizer(list(texts[start:start + batch_size]), padding=True, truncation=True, return_tensors="np")
+            hidden = self.model(**batch).last_hidden_state
+            hidden = np.asarray(hidden, dtype=np.float32)
+            mask = batch["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            outputs.append(pooled)
+        if not outputs:
+            return np.zeros((0, self.model.config.hidden_size), dtype=np.float32)
+        return np.vstack(outputs)
+
+
+def load_sentence_encoder(model_name):
+    """
+    Return (encoder, backend) for a sentence-transformers model on the configured
+    backend. The encoder exposes ``encode(texts, convert_to_numpy=True)``.
+    """
+    if backend_name() == "onnx":
+        try:
+            suffix = "onnx-int8" if quantize_enabled() else "onnx"
+            return OnnxSentenceEncoder(model_name), suffix
+        except Exception as e:
+            print(f"ONNX backend unavailable for {model_name}: {e}. Falling back to PyTorch.")
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name), "torch"
@@ -1,27 +1,36 @@
 # main.py
 import asyncio
 import importlib
-from voice.speech_to_text import SpeechToText
-from voice.intent_classifier import IntentClassifier
-# from voice.classifier import TextClassifier
-from api.endpoints import FMPEndpoints
-from rag.retriever import Retriever
-from rag.sql_db import SQL_Key_Pair
-from rag.web_search import duckduckgo_web_search
-
-async def process_query(vosk_model_path, audio_data=None, query_text=None, use_retriever=False):
-    # Step 1: Initialize components
-    stt = SpeechToText(model_path=vosk_model_path)
-    classifier = IntentClassifier()
-    # classifier = TextClassifier()
-    endpoints = FMPEndpoints()
-    # initialize rag tools
-    retriever = Retriever(file_path="./data/financial_data.csv")
-    sql_db = SQL_Key_Pair(file_path="./data/financial_data.csv")
+import json
+import os
+from collections import deque
+from registry import registry
+from rag.web_search import aduckduckgo_web_search
 
+INTENT_TO_MODULE = {
+    "get_net_income": ("modules.get_net_income", "GetNetIncome"),
+    "get_revenue": ("modules.get_revenue", "GetRevenue"),
+    "get_stock_price": ("modules.get_stock_price", "GetStockPrice"),
+    "get_profit_margin": ("modules.get_profit_margin", "GetProfitMargin"),
+    "get_company_profile": ("modules.get_company_profile", "GetCompanyProfile"),
+    "get_market_cap": ("modules.get_market_cap", "GetMarketCap"),
+    "get_historical_stock_price": ("modules.get_historical_stock_price", "GetHistoricalStockPrice"),
+    "get_dividend_info": ("modules.get_dividend_info", "GetDividendInfo"),
+    "get_balance_sheet": ("modules.get_balance_sheet", "GetBalanceSheet"),
+    "get_cash_flow": ("modules.get_cash_flow", "GetCashFlow"),
+    "get_financial_ratios": ("modules.get_financial_ratios", "GetFinancialRatios"),
+    "get_earnings_per_share": ("modules.get_earnings_per_share", "GetEarningsPerShare"),
+    "get_interest": ("modules.get_interest", "GetInterest"),
+    "get_income_tax": ("modules.get_income_tax", "GetIncomeTax"),
+    "get_cost_info": ("modules.get_cost_info", "GetCostInfo"),
+    "get_research_info": ("modules.get_research_info", "GetResearchInfo")
+}
+
+
+def new_output(text=""):
     # Output format
-    output = {
-        "User asked": "",
+    return {
+        "User asked": text,
         "intent": "",
         "entities": "",
         "base_response": "",
@@ -31,10 +40,177 @@ async def process_query(vosk_model_path, audio_data=None, query_text=None, use_r
         "error": ""
     }
 
+
+def base_response_ok(base_response):
+    """Whether an API module response is a usable answer."""
+    return bool(base_response) and "Error" not in str(base_response) and "None" not in str(base_response)
+
+
+def store_response_ok(retriever_response):
+    """Whether a CSV store response is a usable answer (no match sends the query to the web)."""
+    return "No relevant data found" not in retriever_response
+
+
+async def get_base_response(class_instance, entities):
+    try:
+        return await class_instance.get_data(
+            ticker=entities["ticker"],
+            year=entities["year"],
+            date=entities["date"],
+        )
+    except Exception as e:
+        return f"Error fetching base response: {e}"
+
+
+def set_web_response(output, search_results):
+    if search_results:
+        output["web_search_response"] = search_results[0]['snippet']
+    else:
+        output["web_search_response"] = "No relevant data found on the web."
+    return output["web_search_response"]
+
+
+async def sequential_lookup(text, class_instance, entities, output, sql_db, use_retriever=False):
+    """
+    Try the API module, then the CSV store, then web search, each only after the previous one failed.
+    """
+    # Step 4: Get the base response from the module
+    base_response = await get_base_response(class_instance, entities)
+
+    # Step 5: Handle the response based on requirements
+    if base_response_ok(base_response):
+        # Base response succeeded
+        final_response = base_response
+        output["base_response"] = f"{final_response}"
+
+        # Use retriever if specified (optional)
+        if use_retriever:
+            retriever_response = sql_db.query_db(entities["ticker"], entities["metric"])
+            final_response = f"{final_response} Additional Info found in the CSV: {retriever_response}"
+            output["retriever_response"] = retriever_response
+    else:
+        # Base response failed, use the retriever
+        output["base_response"] = f"{base_response} Using retriever to query CSV file..."
+        retriever_response = sql_db.query_db(entities["ticker"], entities["metric"])
+        output["retriever_response"] = retriever_response
+
+        if store_response_ok(retriever_response):
+            final_response = retriever_response
+        else:
+            # If both API and rag failed to extract information, search on the web
+            final_response = set_web_response(output, await aduckduckgo_web_search(text))
+
+    output["final_response"] = final_response
+
+
+async def hedged_lookup(text, class_instance, entities, output, sql_db, use_retriever=False, web_delay=None):
+    """
+    Same answer as sequential_lookup, without waiting for each source to fail in turn.
+
+    The API call and the CSV store query start together; web search starts
+    after ``web_delay`` seconds, or as soon as both have failed. A source's
+    result is taken once every higher-priority source (API > CSV > web) has
+    failed, and the sources that are no longer needed are cancelled, so the
+    output fields match sequential_lookup.
+    """
+    web_delay = web_delay if web_delay is not None else float(os.getenv("HEDGE_WEB_DELAY", "1.0"))
+    start_web = asyncio.Event()
+
+    async def delayed_web_search():
+        try:
+            await asyncio.wait_for(start_web.wait(), timeout=web_delay)
+        except asyncio.TimeoutError:
+            pass
+        return await aduckduckgo_web_search(text)
+
+    api = asyncio.create_task(get_base_response(class_instance, entities))
+    store = asyncio.create_task(asyncio.to_thread(sql_db.query_db, entities["ticker"], entities["metric"]))
+    web = asyncio.create_task(delayed_web_search())
+    try:
+        base_response = await api
+        if base_response_ok(base_response):
+            web.cancel()
+            final_response = base_response
+            output["base_response"] = f"{final_response}"
+            if use_retriever:
+                retriever_response = await store
+                final_response = f"{final_response} Additional Info found in the CSV: {retriever_response}"
+                output["retriever_response"] = retriever_response
+        else:
+            output["base_response"] = f"{base_response} Using retriever to query CSV file..."
+            retriever_response = await store
+            output["retriever_response"] = retriever_response
+            if store_response_ok(retriever_response):
+                web.cancel()
+                final_response = retriever_response
+            else:
+                start_web.set()
+                final_response = set_web_response(output, await web)
+        output["final_response"] = final_response
+    finally:
+        # Losers are cancelled (the store query's thread finishes on its own and is dropped);
+        # failures of results nobody needed are marked retrieved so they are not logged
+        for task in (api, store, web):
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()
+
+
+async def fetch_answer(text, intent, entities, output, sql_db, use_retriever=False, hedged=None):
+    """
+    Steps 4-5 of process_query: answer from the API module, else the CSV store, else web search.
+    Fills ``output`` in place.
+
+    With ``hedged`` (default: HEDGED_LOOKUP env var) the sources are queried
+    speculatively in parallel (see hedged_lookup) instead of one after another;
+    the answer is the same.
+    """
+    if hedged is None:
+        hedged = os.getenv("HEDGED_LOOKUP", "0").lower() in ("1", "true", "yes")
+    if intent:
+        # Identify module for API calling
+        module_info = INTENT_TO_MODULE.get(intent)
+        if module_info:
+            module_path, class_name = module_info
+            try:
+                module = importlib.import_module(module_path)
+                class_instance = getattr(module, class_name)()
+                lookup = hedged_lookup if hedged else sequential_lookup
+                await lookup(text, class_instance, entities, output, sql_db, use_retriever)
+            except ImportError as e:
+                output["error"] = f"Module import error: {e}"
+            except AttributeError as e:
+                output["error"] = f"Class not found in module: {e}"
+            except Exception as e:
+                output["error"] = f"Error processing intent {intent}: {e}"
+        else:
+            output["error"] = f"Unsupported intent: {intent}"
+    else:
+        output["error"] = "Could not classify intent."
+
+
+async def resolve_components(components, *names):
+    """
+    Get registry components without blocking the event loop. A component that is
+    still loading (e.g. by the startup warm-up) holds its lock until it is ready.
+    """
+    return await asyncio.to_thread(lambda: [getattr(components, name) for name in names])
+
+
+async def process_query(audio_data=None, query_text=None, use_retriever=False, components=None):
+    # Step 1: Get the shared components (loaded once per process, see registry.py)
+    components = components or registry
+    classifier, sql_db = await resolve_components(components, "classifier", "sql_db")
+    # retriever = components.retriever
+
+    output = new_output()
+
     try:
         # Step 2: Process input (text or audio)
         if audio_data:
-            text = stt.transcribe_audio(audio_data)
+            transcriber, = await resolve_components(components, "transcriber")
+            text = await transcriber.transcribe_file(audio_data)
             if not text:
                 output["error"] = "Could not understand the audio."
                 return output
@@ -46,100 +222,14 @@ async def process_query(vosk_model_path, audio_data=None, query_text=None, use_r
 
         output["User asked"] = text
 
-        # Step 3: Classify intent (zero-shot) and extract entities
-        intent = classifier.classify_with_llm(text)
+        # Step 3: Classify intent (keywords, then zero-shot if unsure) and extract entities
+        intent = classifier.classify(text)
         output["intent"] = intent if intent else "Could not classify intent."
 
         entities = classifier.extract_entities(text)
         output["entities"] = str(entities)
 
-        if intent:
-            intent_to_module = {
-                "get_net_income": ("modules.get_net_income", "GetNetIncome"),
-                "get_revenue": ("modules.get_revenue", "GetRevenue"),
-                "get_stock_price": ("modules.get_stock_price", "GetStockPrice"),
-                "get_profit_margin": ("modules.get_profit_margin", "GetProfitMargin"),
-                "get_company_profile": ("modules.get_company_profile", "GetCompanyProfile"),
-                "get_market_cap": ("modules.get_market_cap", "GetMarketCap"),
-                "get_historical_stock_price": ("modules.get_historical_stock_price", "GetHistoricalStockPrice"),
-                "get_dividend_info": ("modules.get_dividend_info", "GetDividendInfo"),
-                "get_balance_sheet": ("modules.get_balance_sheet", "GetBalanceSheet"),
-                "get_cash_flow": ("modules.get_cash_flow", "GetCashFlow"),
-                "get_financial_ratios": ("modules.get_financial_ratios", "GetFinancialRatios"),
-                "get_earnings_per_share": ("modules.get_earnings_per_share", "GetEarningsPerShare"),
-                "get_interest": ("modules.get_interest", "GetInterest"),
-                "get_income_tax": ("modules.get_income_tax", "GetIncomeTax"),
-                "get_cost_info": ("modules.get_cost_info", "GetCostInfo"),
-                "get_research_info": ("modules.get_research_info", "GetResearchInfo")
-                
-            }
-
-            # Identify module for API calling
-            module_info = intent_to_module.get(intent)
-            if module_info:
-                module_path, class_name = module_info
-                try:
-                    module = importlib.import_module(module_path)
-                    class_instance = getattr(module, class_name)()
-                    ticker = entities["ticker"]
-
-                    # Step 4: Get the base response from the module
-                    base_response = None
-                    try:
-                        base_response = await class_instance.get_data(
-                            ticker=ticker,
-                            year=entities["year"],
-                            date=entities["date"],
-                        )
-                    except Exception as e:
-                        base_response = f"Error fetching base response: {e}"
-                    
-
-                    # Step 5: Handle the response based on requirements
-                    final_response = None
-                    if base_response and "Error" not in str(base_response) and "None" not in str(base_response):
-                        # Base response succeeded
-                        final_response = base_response
-                        output["base_response"] = f"{final_response}"
-                        
-                        # Use retriever if specified (optional)
-                        if use_retriever:
-                            # retriever_response = retriever.retrieve(text, entities)
-                            # retriever_response = sql_db.entity_based_query(entities)
-                            retriever_response = sql_db.query_db(entities["ticker"], entities["metric"])
-                            final_response = f"{final_response} Additional Info found in the CSV: {retriever_response}"
-                            output["retriever_response"] = retriever_response
-                    else:
-                        # Base response failed, use the retriever
-                        output["base_response"] = f"{base_response} Using retriever to query CSV file..."
-                        # retriever_response = retriever.retrieve(text, entities)
-                        # retriever_response = sql_db.keyword_match_search(entities)
-                        retriever_response = sql_db.query_db(entities["ticker"], entities["metric"])
-                        output["retriever_response"] = retriever_response
-
-                        if "No relevant data found" in retriever_response:
-                            # If both API and rag failed to extract information, search on the web
-                            search_results = duckduckgo_web_search(text)
-                            if search_results:
-                                output["web_search_response"] = search_results[0]['snippet']
-                                final_response = search_results[0]['snippet']
-                            else:
-                                output["web_search_response"] = "No relevant data found on the web."
-                                final_response = "No relevant data found on the web."
-                        else:
-                            final_response = retriever_response
-
-                    output["final_response"] = final_response
-                except ImportError as e:
-                    output["error"] = f"Module import error: {e}"
-                except AttributeError as e:
-                    output["error"] = f"Class not found in module: {e}"
-                except Exception as e:
-                    output["error"] = f"Error processing intent {intent}: {e}"
-            else:
-                output["error"] = f"Unsupported intent: {intent}"
-        else:
-            output["error"] = "Could not classify intent."
+        await fetch_answer(text, intent, entities, output, sql_db, use_retriever)
 
     except Exception as e:
         output["error"] = f"Unexpected error: {e}"
@@ -147,3 +237,114 @@ async def process_query(vosk_model_path, audio_data=None, query_text=None, use_r
     # print(output)
     # Return output to the User Interface
     return output
+
+
+def parse_questions(lines):
+    """
+    Parse JSONL questions. Each line is a JSON string or an object with a
+    "question" (or "query_text"/"text") field and an optional "id".
+
+    Returns:
+        list of dict: {"id", "question"} in input order.
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    questions = []
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {number} is not valid JSON: {e}")
+        if isinstance(record, str):
+            record = {"question": record}
+        if not isinstance(record, dict):
+            raise ValueError(f"Line {number} must be a JSON object or string.")
+        question = record.get("question") or record.get("query_text") or record.get("text") or ""
+        questions.append({"id": record.get("id", len(questions)), "question": str(question)})
+    return questions
+
+
+def analyze_batch(classifier, texts):
+    """
+    Step 3 for a batch: one batched intent call and one nlp.pipe pass for entities.
+    """
+    intents = classifier.classify_batch(texts)
+    entities = classifier.extract_entities_batch(texts)
+    return intents, entities
+
+
+async def process_batch(questions, use_retriever=False, components=None, concurrency=None, chunk_size=None):
+    """
+    Answer many questions, yielding one output dict per question in input order.
+
+    Questions are classified and tagged in chunks (batched model calls, run in a
+    worker thread) while the API/CSV/web lookups of earlier chunks run
+    concurrently, at most ``concurrency`` at a time. At most two chunks of
+    results are held at once: the next chunk is only analysed after the
+    consumer has taken enough outputs, so a slow reader bounds memory too.
+    Each output is the process_query output plus the question's "id".
+
+    Args:
+        questions (list of dict): {"id", "question"} records, e.g. from parse_questions.
+        use_retriever (bool): Same as process_query.
+        components (ComponentRegistry, optional): Defaults to the shared registry.
+        concurrency (int, optional): Concurrent lookups. Defaults to BATCH_CONCURRENCY or 8.
+        chunk_size (int, optional): Questions per model batch. Defaults to BATCH_CHUNK_SIZE or 32.
+    """
+    components = components or registry
+    concurrency = concurrency or int(os.getenv("BATCH_CONCURRENCY", "8"))
+    chunk_size = chunk_size or int(os.getenv("BATCH_CHUNK_SIZE", "32"))
+    semaphore = asyncio.Semaphore(concurrency)
+    classifier, sql_db = await resolve_components(components, "classifier", "sql_db")
+
+    async def lookup(record, intent, entities):
+        output = new_output(record["question"])
+        output["id"] = record["id"]
+        output["intent"] = intent if intent else "Could not classify intent."
+        output["entities"] = str(entities)
+        async with semaphore:
+            try:
+                await fetch_answer(record["question"], intent, entities, output, sql_db, use_retriever)
+            except Exception as e:
+                output["error"] = f"Unexpected error: {e}"
+        return output
+
+    max_pending = 2 * chunk_size
+    pending = deque()
+    try:
+        for start in range(0, len(questions), chunk_size):
+            # Back-pressure: wait for the consumer before taking on another chunk
+            while len(pending) > max_pending - chunk_size:
+                yield await pending.popleft()
+            chunk = questions[start:start + chunk_size]
+            texts = [record["question"] for record in chunk if record["question"]]
+            analysis_error = None
+            try:
+                intents, entities = await asyncio.to_thread(analyze_batch, classifier, texts)
+            except Exception as e:
+                intents, entities = None, None
+                analysis_error = f"Unexpected error: {e}"
+            results = iter(zip(intents, entities)) if intents is not None else None
+            for record in chunk:
+                if not record["question"] or results is None:
+                    output = new_output(record["question"])
+                    output["id"] = record["id"]
+                    output["error"] = analysis_error if results is None else "No audio or text query provided."
+                    done = asyncio.get_running_loop().create_future()
+                    done.set_result(output)
+                    pending.append(done)
+                    continue
+                intent, record_entities = next(results)
+                pending.append(asyncio.create_task(lookup(record, intent, record_entities)))
+            # Stream whatever has finished at the head of the queue
+            while pending and pending[0].done():
+                yield pending.popleft().result()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        # The consumer went away (e.g. client disconnected): stop outstanding lookups
+        for task in pending:
+            task.cancel()
@@ -1,10 +1,27 @@
 # rag/embedder.py
-from sentence_transformers import SentenceTransformer
+from collections import OrderedDict
 import numpy as np
+import os
+import threading
+from inference_backend import load_sentence_encoder
 
 class Embedder:
-    def __init__(self, model_name="all-MiniLM-L6-v2"):   # "all-mpnet-base-v2"
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name="all-MiniLM-L6-v2", cache_size=10000, cache_path=None):   # "all-mpnet-base-v2"
+        # SentenceTransformer, or its ONNX Runtime twin when INFERENCE_BACKEND=onnx
+        self.model, self.backend = load_sentence_encoder(model_name)
+        # Vectors from different backends are not interchangeable, so the backend is
+        # part of the name used for cache keys and persisted indexes
+        self.model_name = model_name if self.backend == "torch" else f"{model_name}@{self.backend}"
+        # Bounded LRU of text -> embedding; tickers, metric names and repeated
+        # questions are embedded over and over
+        self.cache_size = cache_size
+        self.cache_path = cache_path if cache_path is not None else os.getenv("EMBED_CACHE_PATH")
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.cache_path:
+            self.load_cache()
 
     def embed(self, texts):
         """
@@ -16,5 +33,90 @@ class Embedder:
         """
         if isinstance(texts, str):
             texts = [texts]
-        embeddings = self.model.encode(texts, convert_to_numpy=True)
-        return embeddings
\ No newline at end of file
+        if len(texts) == 0:
+            return self.model.encode(texts, convert_to_numpy=True)
+
+        results = [None] * len(texts)
+        missing = OrderedDict()  # text -> positions in the batch, so duplicates are encoded once
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = (self.model_name, text)
+                vector = self._cache.get(key)
+                if vector is None:
+                    missing.setdefault(text, []).append(i)
+                    self.misses += 1
+                else:
+                    self._cache.move_to_end(key)
+                    results[i] = vector
+                    self.hits += 1
+
+        if missing:
+            encoded = self.model.encode(list(missing), convert_to_numpy=True)
+            with self._lock:
+                for (text, positions), vector in zip(missing.items(), encoded):
+                    vector.setflags(write=False)
+                    self._remember((self.model_name, text), vector)
+                    for i in positions:
+                        results[i] = vector
+
+        # np.vstack copies, so callers never get a view into the cache
+        return np.vstack(results)
+
+    def _remember(self, key, vector):
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def cache_stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "size": len(self._cache),
+            "max_size": self.cache_size,
+        }
+
+    def load_cache(self):
+        """
+        Load persisted embeddings for this model from ``cache_path`` (an .npz file).
+        """
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as stored:
+                if str(stored["model_name"]) != self.model_name:
+                    print(f"Embedding cache at {self.cache_path} belongs to another model; ignoring it.")
+                    return
+                with self._lock:
+                    for text, vector in zip(stored["texts"].tolist(), stored["vectors"]):
+                        vector.setflags(write=False)
+                        self._remember((self.model_name, text), vector)
+            print(f"Loaded {len(self._cache)} cached embeddings from {self.cache_path}")
+        except Exception as e:
+            print(f"Error loading embedding cache: {e}")
+
+    def save_cache(self):
+        """
+        Persist the cached embeddings to ``cache_path`` so they survive restarts.
+        """
+        if not self.cache_path:
+            return
+        with self._lock:
+            items = [(text, vector) for (model_name, text), vector in self._cache.items() if model_name == self.model_name]
+        if not items:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp{os.getpid()}.npz"
+            np.savez(
+                tmp_path,
+                model_name=np.array(self.model_name),
+                texts=np.array([text for text, _ in items]),
+                vectors=np.vstack([vector for _, vector in items]),
+            )
+            os.replace(tmp_path, self.cache_path)
+            print(f"Saved {len(items)} embeddings to {self.cache_path}")
+        except Exception as e:
+            print(f"Error saving embedding cache: {e}")
@@ -0,0 +1,124 @@
+# rag/metric_store.py
+import numpy as np
+import pandas as pd
+
+
+class MetricStore:
+    """
+    Read-only columnar view of the financial CSV built for point lookups.
+
+    Rows are sorted by ticker, then by year (newest first), keeping file order
+    within a year. Each numeric metric is a float64 array in that row order, and
+    two dict indexes map a ticker and a (ticker, year) pair to contiguous row
+    ranges. A lookup is therefore a dict hit plus a slice, with no DataFrame scan.
+    """
+
+    def __init__(self, data):
+        if data is None or data.empty or "Ticker" not in data.columns:
+            self.size = 0
+            self.tickers = np.array([], dtype=object)
+            self.years = np.array([], dtype=object)
+            self.columns = {}
+            self.metric_names = []
+            self.year_values = []
+            self._metric_lookup = {}
+            self._ticker_ranges = {}
+            self._ticker_year_ranges = {}
+            return
+
+        tickers = data["Ticker"].astype(str)
+        if "Year" in data.columns:
+            years = data["Year"].astype(str)
+        elif "date" in data.columns:
+            years = data["date"].astype(str).str[:4]
+        else:
+            years = pd.Series([""] * len(data), index=data.index)
+
+        keys = pd.DataFrame({"ticker": tickers.str.lower().values, "year": years.values})
+        order = keys.sort_values(["ticker", "year"], ascending=[True, False], kind="mergesort").index.to_numpy()
+
+        self.size = len(order)
+        self.tickers = tickers.to_numpy()[order]
+        self.years = years.to_numpy()[order]
+        self.year_values = sorted(set(self.years), reverse=True)
+
+        # Every numeric column except the row number and the year becomes a metric array
+        self.columns = {}
+        for column in data.columns:
+            if str(column).startswith("Unnamed") or column in ("Year", "Ticker", "firm", "date"):
+                continue
+            if pd.api.types.is_numeric_dtype(data[column]):
+                self.columns[column] = data[column].to_numpy(dtype=np.float64)[order]
+        self.metric_names = list(self.columns)
+        self._metric_lookup = {name.lower(): name for name in self.metric_names}
+
+        self._ticker_ranges = {}
+        self._ticker_year_ranges = {}
+        lowered = keys["ticker"].to_numpy()[order]
+        start = 0
+        for i in range(1, self.size + 1):
+            if i == self.size or lowered[i] != lowered[start]:
+                self._ticker_ranges[lowered[start]] = (start, i)
+                year_start = start
+                for j in range(start + 1, i + 1):
+                    if j == i or self.years[j] != self.years[year_start]:
+                        self._ticker_year_ranges[(lowered[start], self.years[year_start])] = (year_start, j)
+                        year_start = j
+                start = i
+
+    @classmethod
+    def from_file(cls, file_path):
+        """
+        Build a store from a CSV or Excel file.
+        """
+        if file_path.endswith('.csv'):
+            data = pd.read_csv(file_path)
+        elif file_path.endswith('.xlsx') or file_path.endswith('.xls'):
+            data = pd.read_excel(file_path)
+        else:
+            raise ValueError("Unsupported file format. Use .csv, .xlsx, or .xls")
+        return cls(data)
+
+    def metric_name(self, metric):
+        """
+        Return the stored column name for a metric (case-insensitive), or None.
+        """
+        if not metric:
+            return None
+        return self._metric_lookup.get(str(metric).lower())
+
+    def rows(self, ticker, year=None):
+        """
+        Return the slice of rows for a ticker, optionally restricted to one year.
+        """
+        if not ticker:
+            return slice(0, 0)
+        key = str(ticker).lower()
+        bounds = self._ticker_ranges.get(key) if year is None else self._ticker_year_ranges.get((key, str(year)))
+        return slice(*bounds) if bounds else slice(0, 0)
+
+    def value(self, ticker, metric, year=None):
+        """
+        Return the first non-null value of a metric for a ticker (and year), or None.
+
+        Without a year the newest year wins; within a year file order is kept.
+        """
+        column = self.metric_name(metric)
+        if column is None:
+            return None
+        values = self.columns[column][self.rows(ticker, year)]
+        present = np.flatnonzero(~np.isnan(values))
+        return float(values[present[0]]) if present.size else None
+
+    def series(self, ticker, metric):
+        """
+        Return (years, values) arrays for every report of a ticker, newest first.
+        """
+        column = self.metric_name(metric)
+        rows = self.rows(ticker)
+        if column is None:
+            return self.years[0:0], np.array([], dtype=np.float64)
+        return self.years[rows], self.columns[column][rows]
+
+    def has_ticker(self, ticker):
+        return bool(ticker) and str(ticker).lower() in self._ticker_ranges
@@ -1,19 +1,26 @@
 import pandas as pd
-import faiss
 import numpy as np
 from .embedder import Embedder
+from .metric_store import MetricStore
+from .ticker_index import TickerIndex
 from fuzzywuzzy import fuzz
 from langchain_community.llms import Ollama
 from langchain.prompts import PromptTemplate
 
 class Retriever:
-    def __init__(self, file_path):
-        self.embedder = Embedder(model_name="all-MiniLM-L6-v2")
+    def __init__(self, file_path, embedder=None, metric_store=None):
+        # Reuse a shared embedder when one is provided to avoid loading MiniLM twice
+        self.embedder = embedder or Embedder(model_name="all-MiniLM-L6-v2")
         self.index = None
         self.documents = []
         self.data = None
         self.embeddings = None
+        self.metric_names = []
+        self.metric_embeddings = None
+        self.file_path = file_path
         self.load_file(file_path)
+        # Columnar (ticker, metric, year) lookups instead of DataFrame masks
+        self.store = metric_store or MetricStore(self.data)
         self.build_index()
 
     def load_file(self, file_path):
@@ -33,10 +40,31 @@ class Retriever:
     def build_index(self):
         if not self.documents:
             return
-        self.embeddings = self.embedder.embed(self.documents)
-        dim = self.embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dim)
-        self.index.add(self.embeddings)
+        # Shared with SQL_Key_Pair and persisted across restarts (see ticker_index.py)
+        ticker_index = TickerIndex.load_or_build(self.file_path, self.documents, self.embedder)
+        self.index = ticker_index.index
+        self.embeddings = ticker_index.embeddings
+        self.build_metric_embeddings()
+
+    def build_metric_embeddings(self):
+        """
+        Embed and L2-normalize the metric names once, so scoring a query is a single matrix-vector product.
+        """
+        self.metric_names = list(self.store.metric_names)
+        if not self.metric_names:
+            self.metric_embeddings = None
+            return
+        embeddings = np.asarray(self.embedder.embed(self.metric_names), dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        self.metric_embeddings = embeddings / np.maximum(norms, 1e-12)
+
+    def score_years(self, query_year, exact=True):
+        """
+        Score candidate years: an exact hit is the only candidate, otherwise fall back to fuzzy matching.
+        """
+        if exact and query_year in self.store.year_values:
+            return [(query_year, 1.0)]
+        return [(year, fuzz.ratio(query_year, year) / 100.0) for year in self.store.year_values]
 
     def retrieve(self, query, entities, k=3, threshold=0.7):
         
@@ -58,32 +86,43 @@ class Retriever:
         ticker_matches = []
         for i, idx in enumerate(indices[0]):
             if idx < len(self.documents):
-                ticker = self.data.iloc[idx]["Ticker"]
+                ticker = self.documents[idx]
                 similarity_score = 1 - distances[0][i] / 2
                 ticker_matches.append((ticker, similarity_score, idx))
 
-        # Metric similarity
-        metric_embeddings = self.embedder.embed(self.data.columns.tolist())
-        query_metric_embedding = self.embedder.embed([query_metric])[0]
+        # Metric similarity: cosine against the precomputed, normalized metric embeddings
+        query_metric_embedding = np.asarray(self.embedder.embed([query_metric])[0], dtype=np.float32)
+        query_metric_embedding /= max(np.linalg.norm(query_metric_embedding), 1e-12)
         metric_scores = []
-        for col, col_embedding in zip(self.data.columns, metric_embeddings):
-            if col.lower() in ["ticker", "year"]:
-                continue
-            cos_sim = np.dot(query_metric_embedding, col_embedding) / (
-                np.linalg.norm(query_metric_embedding) * np.linalg.norm(col_embedding)
-            )
-            metric_scores.append((col, cos_sim))
+        if self.metric_embeddings is not None:
+            similarities = self.metric_embeddings @ query_metric_embedding
+            metric_scores = [(self.metric_names[i], float(similarities[i])) for i in np.flatnonzero(similarities >= threshold)]
 
         # Year similarity
         if "Year" not in self.data.columns:
             print("No 'Year' column found in data")
             return []
-        year_scores = []
-        for year in self.data["Year"].astype(str).unique():
-            similarity = fuzz.ratio(query_year, year) / 100.0
-            year_scores.append((year, similarity))
+        year_scores = self.score_years(query_year)
+
+        retrieved_data = self.combine_matches(ticker_matches, metric_scores, year_scores, threshold)
+        if not retrieved_data and query_year in self.store.year_values:
+            # The exact year had no data for these tickers/metrics; widen to the fuzzy candidates
+            year_scores = self.score_years(query_year, exact=False)
+            retrieved_data = self.combine_matches(ticker_matches, metric_scores, year_scores, threshold)
+
+        if retrieved_data:
+            # print(retrieved_data)
+            retrieved_data.sort(key=lambda x: x["combined_score"], reverse=True)
+            best_match = retrieved_data[0]
+            answer = answer_question(query, best_match)
+            return answer
 
-        # Combine matches
+        return "No relevant data found."
+
+    def combine_matches(self, ticker_matches, metric_scores, year_scores, threshold):
+        """
+        Look up every (ticker, metric, year) candidate above threshold and score it.
+        """
         retrieved_data = []
         seen = set()
         for ticker, ticker_score, idx in ticker_matches:
@@ -96,13 +135,8 @@ class Retriever:
                     if year_score < 0.5:
                         continue
                     combined_score = (ticker_score + metric_score + year_score) / 3
-                    match = self.data[
-                        (self.data["Ticker"].str.lower() == ticker.lower()) &
-                        (self.data["Year"].astype(str) == year) &
-                        (self.data[metric].notnull())
-                    ]
-                    if not match.empty:
-                        value = match[metric].iloc[0]
+                    value = self.store.value(ticker, metric, year)
+                    if value is not None:
                         key = (ticker, metric, year)
                         if key not in seen:
                             seen.add(key)
@@ -113,15 +147,7 @@ class Retriever:
                                 "year": year,
                                 "combined_score": combined_score
                             })
-
-        if retrieved_data:
-            # print(retrieved_data)
-            retrieved_data.sort(key=lambda x: x["combined_score"], reverse=True)
-            best_match = retrieved_data[0]
-            answer = answer_question(query, best_match)
-            return answer
-
-        return "No relevant data found."
+        return retrieved_data
 
 def answer_question(question, retrieved_data):
     """
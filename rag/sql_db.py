@@ -1,22 +1,30 @@
 import os
+import hashlib
 import pandas as pd
-import faiss
 import numpy as np
 import sqlite3
+import threading
 from .embedder import Embedder
+from .metric_store import MetricStore
+from .ticker_index import TickerIndex
 from datetime import datetime
 
 class SQL_Key_Pair:
-    def __init__(self, file_path="financial_data.csv", model_name="all-MiniLM-L6-v2", db_path="/app/db/financial_data.db"):
+    def __init__(self, file_path="financial_data.csv", model_name="all-MiniLM-L6-v2", db_path="/app/db/financial_data.db", embedder=None, metric_store=None):
         # Ensure the database directory exists
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
-        self.embedder = Embedder(model_name)
+        self.embedder = embedder or Embedder(model_name)
         self.index = None
         self.documents = []
         self.data = None
         self.embeddings = None
+        self.store = metric_store
+        self.file_path = None
         try:
-            self.db_conn = sqlite3.connect(db_path)
+            # The instance is shared across requests and worker threads, so the
+            # connection is not pinned to its creating thread; access is serialized by db_lock
+            self.db_conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.db_lock = threading.Lock()
             print(f"Connected to SQLite database at {db_path}")
         except sqlite3.OperationalError as e:
             print(f"Failed to connect to database: {e}")
@@ -26,27 +34,72 @@ class SQL_Key_Pair:
 
     def create_db_table(self):
         """
-        Create the custom_financials table in the database if it doesn’t exist.
+        Create the normalized financial tables in the database if they don’t exist.
+
+        companies and metrics are small lookup tables; financial_facts holds one
+        typed REAL per (company, metric, period, seq), where seq orders the reports
+        a company filed within the same period. sources records the content hash
+        of every ingested file.
         """
         cursor = self.db_conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS custom_financials (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                source_file TEXT,
-                firm TEXT,
-                ticker TEXT,
-                date TEXT,
-                metric TEXT,
-                value REAL,
+        legacy = [name for (name,) in cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('custom_financials', 'ingest_state')"
+        )]
+        for name in legacy:
+            # Superseded EAV layout, derived entirely from the source files
+            cursor.execute(f"DROP TABLE {name}")
+            print(f"Dropped legacy {name} table")
+        cursor.executescript("""
+            CREATE TABLE IF NOT EXISTS sources (
+                id INTEGER PRIMARY KEY,
+                file TEXT NOT NULL UNIQUE,
+                content_hash TEXT NOT NULL,
+                row_count INTEGER,
                 last_updated TEXT
-            )
+            );
+            CREATE TABLE IF NOT EXISTS companies (
+                id INTEGER PRIMARY KEY,
+                ticker TEXT NOT NULL UNIQUE COLLATE NOCASE,
+                firm TEXT
+            );
+            CREATE TABLE IF NOT EXISTS metrics (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE COLLATE NOCASE
+            );
+            CREATE TABLE IF NOT EXISTS financial_facts (
+                company_id INTEGER NOT NULL REFERENCES companies (id),
+                metric_id INTEGER NOT NULL REFERENCES metrics (id),
+                period TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                value REAL NOT NULL,
+                source_id INTEGER NOT NULL REFERENCES sources (id),
+                PRIMARY KEY (company_id, metric_id, period, seq)
+            ) WITHOUT ROWID;
         """)
         self.db_conn.commit()
-        print("Created custom_financials table")
+        if legacy:
+            # Give the pages of the dropped tables back to the filesystem
+            self.db_conn.execute("VACUUM")
+        print("Created financial tables")
+
+    @staticmethod
+    def file_fingerprint(file_path):
+        """
+        Return the SHA-256 of a file's contents.
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
 
     def load_data(self, file_path):
         """
         Load financial data from a CSV or Excel file and store it in the database.
+
+        Ingestion is skipped when the file's content hash matches the last load.
+        Otherwise the file's facts are replaced in one transaction, with numeric
+        cells upserted on the natural key (company, metric, period, seq).
         """
         try:
             if file_path.endswith('.csv'):
@@ -57,41 +110,131 @@ class SQL_Key_Pair:
                 raise ValueError("Unsupported file format. Use .csv or .xlsx.")
 
             self.data = df
+            self.file_path = file_path
             self.documents = self.data["Ticker"].astype(str).tolist()
-            
-            cursor = self.db_conn.cursor()
-            for _, row in self.data.iterrows():
-                firm = row.get("firm", "")
-                ticker = row.get("Ticker", "")
-                date = row.get("date", "")
-                for column in self.data.columns:
-                    if pd.notna(row[column]):
-                        try:
-                            value = float(row[column])
-                        except (ValueError, TypeError):
-                            value = 0.0
-                        cursor.execute("""
-                            INSERT INTO custom_financials (source_file, firm, ticker, date, metric, value, last_updated)
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
-                        """, (os.path.basename(file_path), firm, ticker, str(date), column, value, datetime.now().isoformat()))
-            self.db_conn.commit()
-            print(f"Loaded {len(self.data)} rows from {file_path} into custom_financials.")
+            if self.store is None:
+                self.store = MetricStore(df)
+
+            source_file = os.path.basename(file_path)
+            content_hash = self.file_fingerprint(file_path)
+            stored = self.db_conn.execute(
+                "SELECT content_hash FROM sources WHERE file = ?", (source_file,)
+            ).fetchone()
+            if stored and stored[0] == content_hash:
+                print(f"{file_path} is unchanged since the last load; skipping ingestion.")
+            else:
+                self._ingest(df, source_file, content_hash)
+                print(f"Loaded {len(self.data)} rows from {file_path} into financial_facts.")
             self.build_index()  # Rebuild FAISS index after loading
         except Exception as e:
             print(f"Error loading data: {e}")
             self.documents = []
             self.data = pd.DataFrame()
 
+    def _ingest(self, df, source_file, content_hash):
+        # Identifier and text columns describe the row; every other column is a metric
+        descriptive = {"ticker", "firm", "date", "year"}
+        id_column = df.columns[0] if str(df.columns[0]).startswith("Unnamed") else None
+        period_column = "date" if "date" in df.columns else ("Year" if "Year" in df.columns else None)
+        metric_columns = [
+            column for column in df.columns
+            if column != id_column and column.lower() not in descriptive
+            and pd.api.types.is_numeric_dtype(df[column])
+        ]
+        tickers = df["Ticker"].astype(str)
+        firms = df["firm"].astype(str) if "firm" in df.columns else tickers
+        periods = df[period_column].astype(str) if period_column else pd.Series([""] * len(df), index=df.index)
+        # Ordinal of each report within its (ticker, period), in file order; tickers
+        # compare case-insensitively, like companies.ticker
+        seqs = df.groupby([tickers.str.lower(), periods]).cumcount()
+        loaded_at = datetime.now().isoformat()
+
+        with self.db_lock, self.db_conn:
+            cursor = self.db_conn.cursor()
+            cursor.execute("""
+                INSERT INTO sources (file, content_hash, row_count, last_updated) VALUES (?, ?, ?, ?)
+                ON CONFLICT (file) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    row_count = excluded.row_count,
+                    last_updated = excluded.last_updated
+            """, (source_file, content_hash, len(df), loaded_at))
+            source_id = cursor.execute("SELECT id FROM sources WHERE file = ?", (source_file,)).fetchone()[0]
+
+            cursor.executemany("""
+                INSERT INTO companies (ticker, firm) VALUES (?, ?)
+                ON CONFLICT (ticker) DO UPDATE SET firm = excluded.firm
+            """, dict(zip(tickers, firms)).items())
+            cursor.executemany("INSERT OR IGNORE INTO metrics (name) VALUES (?)", [(m,) for m in metric_columns])
+            # Both name columns are COLLATE NOCASE, so "aapl" here is the stored "AAPL"
+            company_ids = {ticker.lower(): company_id for ticker, company_id in cursor.execute("SELECT ticker, id FROM companies")}
+            metric_ids = {name.lower(): metric_id for name, metric_id in cursor.execute("SELECT name, id FROM metrics")}
+
+            def facts():
+                for column in metric_columns:
+                    metric_id = metric_ids[column.lower()]
+                    for ticker, period, seq, value in zip(tickers, periods, seqs, df[column]):
+                        if pd.notna(value):
+                            yield (company_ids[ticker.lower()], metric_id, period, int(seq), float(value), source_id)
+
+            cursor.execute("DELETE FROM financial_facts WHERE source_id = ?", (source_id,))
+            cursor.executemany("""
+                INSERT INTO financial_facts (company_id, metric_id, period, seq, value, source_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (company_id, metric_id, period, seq) DO UPDATE SET
+                    value = excluded.value,
+                    source_id = excluded.source_id
+            """, facts())
+
     def build_index(self):
         """
-        Build a FAISS index from the embedded descriptions.
+        Build a FAISS index from the embedded descriptions, or attach to the persisted one.
         """
         if not self.documents:
             return
-        self.embeddings = self.embedder.embed(self.documents)
-        dim = self.embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dim)
-        self.index.add(self.embeddings)
+        ticker_index = TickerIndex.load_or_build(self.file_path, self.documents, self.embedder)
+        self.index = ticker_index.index
+        self.embeddings = ticker_index.embeddings
+
+    def _latest_value(self, ticker, metric):
+        """
+        Return the most recent non-null value of a metric for a ticker (case-insensitive), or None.
+        """
+        query = """
+            SELECT f.value FROM financial_facts f
+            JOIN companies c ON c.id = f.company_id
+            JOIN metrics m ON m.id = f.metric_id
+            WHERE c.ticker = ? AND m.name = ?
+            ORDER BY f.period DESC, f.seq
+            LIMIT 1
+        """
+        with self.db_lock:
+            result = self.db_conn.execute(query, (ticker, metric)).fetchone()
+        return result[0] if result else None
+
+    def get_company_metrics(self, ticker, period=None):
+        """
+        Read every metric of one company's report in a single index range scan.
+
+        Args:
+            ticker (str): Ticker symbol (case-insensitive).
+            period (str, optional): Period to read; defaults to the latest one.
+
+        Returns:
+            dict: metric name -> value for the first report of that period.
+        """
+        query = """
+            SELECT m.name, f.value, f.period FROM financial_facts f
+            JOIN companies c ON c.id = f.company_id
+            JOIN metrics m ON m.id = f.metric_id
+            WHERE c.ticker = ? AND f.seq = 0 AND (? IS NULL OR f.period = ?)
+            ORDER BY f.period DESC
+        """
+        with self.db_lock:
+            rows = self.db_conn.execute(query, (ticker, period, period)).fetchall()
+        if not rows:
+            return {}
+        latest = rows[0][2]
+        return {name: value for name, value, row_period in rows if row_period == latest}
 
     def keyword_match_search(self, entities):
         """
@@ -109,22 +252,12 @@ class SQL_Key_Pair:
         ticker = ticker.lower()
         metric = metric.lower()
 
-        retrieved_text = ""
-        for _, row in self.data.iterrows():
-            if str(row.get("Ticker", "")).lower() == ticker:
-                for col in self.data.columns:
-                    if col.lower() == metric:
-                        if pd.isna(row[col]) or row[col] == "":
-                            continue
-                        value_in_billions = row[col] / 1_000_000_000
-                        retrieved_text = f"Retrieved {metric} for {ticker} is : ${value_in_billions:.2f} billion."
-                        break
-                break
-
-        if not retrieved_text:
+        value = self.store.value(ticker, metric)
+        if value is None:
             return "No relevant data found."
 
-        return retrieved_text
+        value_in_billions = value / 1_000_000_000
+        return f"Retrieved {metric} for {ticker} is : ${value_in_billions:.2f} billion."
 
     def query_csv(self, query, k=3):
         """
@@ -151,20 +284,11 @@ class SQL_Key_Pair:
 
     def query_db(self, ticker, metric):
         """
-        Query the custom_financials table based on ticker and metric, ignoring date and year.
+        Query the financial facts based on ticker and metric, ignoring date and year.
         """
         try:
-            cursor = self.db_conn.cursor()
-            query = """
-                SELECT value FROM custom_financials
-                WHERE ticker = ? AND metric = ?
-                LIMIT 1
-            """
-            params = [ticker, metric]
-            cursor.execute(query, params)
-            result = cursor.fetchone()
-            if result:
-                value = result[0]
+            value = self._latest_value(ticker, metric)
+            if value is not None:
                 value_in_billions = value / 1_000_000_000
                 return f"{metric} for {ticker}: ${value_in_billions:.2f} billion."
             return f"No relevant data found for {ticker}."
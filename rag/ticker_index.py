@@ -0,0 +1,120 @@
+# rag/ticker_index.py
+import hashlib
+import json
+import os
+import threading
+import faiss
+import numpy as np
+
+
+class TickerIndex:
+    """
+    FAISS index over the ticker column, persisted next to its embeddings.
+
+    Artifacts live in ``<cache_dir>/<fingerprint>/`` where the fingerprint covers
+    the source file's contents and the embedding model name. Restarts and other
+    workers memory-map the files instead of re-embedding (IO_FLAG_MMAP_IFC maps
+    the flat index's vectors; plain IO_FLAG_MMAP would copy them), so N workers
+    share the same pages. Within a process every caller gets the same instance.
+    """
+
+    _instances = {}
+    _lock = threading.Lock()
+
+    def __init__(self, documents, index, embeddings=None, path=None):
+        self.documents = documents
+        self.index = index
+        self.embeddings = embeddings
+        self.path = path
+
+    @staticmethod
+    def fingerprint(file_path, model_name):
+        """
+        Hash the source file's contents together with the embedding model name.
+        """
+        digest = hashlib.sha256(model_name.encode("utf-8"))
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()[:16]
+
+    @classmethod
+    def load_or_build(cls, file_path, documents, embedder, cache_dir=None):
+        """
+        Return the shared index for a source file, loading it from disk when possible.
+
+        Args:
+            file_path (str): Source CSV/Excel file the documents came from.
+            documents (list of str): Ticker strings, in row order.
+            embedder (Embedder): Used only when the index has to be built.
+            cache_dir (str, optional): Artifact directory. Defaults to RAG_INDEX_DIR.
+
+        Returns:
+            TickerIndex: The loaded or freshly built index.
+        """
+        cache_dir = cache_dir or os.getenv("RAG_INDEX_DIR", "/app/cache/rag_index")
+        key = cls.fingerprint(file_path, embedder.model_name)
+        with cls._lock:
+            instance = cls._instances.get(key)
+            if instance is None:
+                path = os.path.join(cache_dir, key)
+                instance = cls._load(path, documents)
+                if instance is None:
+                    instance = cls._build(documents, embedder)
+                    instance.save(path)
+                cls._instances[key] = instance
+            return instance
+
+    @classmethod
+    def _load(cls, path, documents):
+        index_path = os.path.join(path, "index.faiss")
+        documents_path = os.path.join(path, "documents.json")
+        if not (os.path.exists(index_path) and os.path.exists(documents_path)):
+            return None
+        try:
+            with open(documents_path, "r", encoding="utf-8") as f:
+                stored_documents = json.load(f)
+            if stored_documents != documents:
+                return None
+            try:
+                # IO_FLAG_MMAP_IFC needs faiss 1.11+; older builds only map inverted lists
+                index = faiss.read_index(index_path, getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP))
+            except RuntimeError:
+                # Index types without mmap support are read into memory
+                index = faiss.read_index(index_path)
+            embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+            print(f"Loaded ticker index from {path}")
+            return cls(documents, index, embeddings, path)
+        except Exception as e:
+            print(f"Error loading ticker index from {path}: {e}. Rebuilding.")
+            return None
+
+    @classmethod
+    def _build(cls, documents, embedder):
+        embeddings = np.ascontiguousarray(embedder.embed(documents), dtype=np.float32)
+        index = faiss.IndexFlatL2(embeddings.shape[1])
+        index.add(embeddings)
+        return cls(documents, index, embeddings)
+
+    def save(self, path):
+        """
+        Write the index, embeddings and documents atomically to ``path``.
+        """
+        try:
+            os.makedirs(path, exist_ok=True)
+            tmp_suffix = f".tmp{os.getpid()}"
+            faiss.write_index(self.index, os.path.join(path, "index.faiss" + tmp_suffix))
+            with open(os.path.join(path, "embeddings.npy" + tmp_suffix), "wb") as f:
+                np.save(f, self.embeddings)
+            with open(os.path.join(path, "documents.json" + tmp_suffix), "w", encoding="utf-8") as f:
+                json.dump(self.documents, f)
+            # documents.json goes last: its presence marks a complete set of artifacts
+            for name in ("index.faiss", "embeddings.npy", "documents.json"):
+                os.replace(os.path.join(path, name + tmp_suffix), os.path.join(path, name))
+            self.path = path
+            print(f"Saved ticker index to {path}")
+        except OSError as e:
+            print(f"Could not persist ticker index to {path}: {e}")
+
+    def search(self, query_embeddings, k):
+        return self.index.search(query_embeddings, k)
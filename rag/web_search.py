@@ -1,4 +1,9 @@
+import asyncio
 from duckduckgo_search import DDGS
+from api.singleflight import SingleFlight
+
+# Identical concurrent searches share one DuckDuckGo request
+web_search_flight = SingleFlight("web_search")
 
 def duckduckgo_web_search(query, max_results=1):
     results = []
@@ -9,4 +14,12 @@ def duckduckgo_web_search(query, max_results=1):
                 "href": r["href"],
                 "snippet": r["body"]
             })
-    return results
\ No newline at end of file
+    return results
+
+async def aduckduckgo_web_search(query, max_results=1):
+    """
+    Async variant of duckduckgo_web_search that runs the blocking search in a
+    worker thread and coalesces concurrent identical queries.
+    """
+    key = (" ".join(query.lower().split()), max_results)
+    return await web_search_flight.do(key, lambda: asyncio.to_thread(duckduckgo_web_search, query, max_results))
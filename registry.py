@@ -0,0 +1,228 @@
+# registry.py
+import os
+import threading
+import time
+from voice.speech_to_text import SpeechToText
+from voice.transcription_service import TranscriptionService
+from voice.intent_classifier import IntentClassifier
+from voice.classifier import TextClassifier
+from voice.centroid_classifier import CentroidIntentClassifier
+from voice.finance_grammar import build_finance_grammar
+from api.endpoints import FMPEndpoints
+from rag.embedder import Embedder
+from rag.metric_store import MetricStore
+from rag.retriever import Retriever
+from rag.sql_db import SQL_Key_Pair
+from rag.web_search import web_search_flight
+
+
+class ComponentRegistry:
+    """
+    Process-wide owner of the heavy components used by process_query.
+
+    Every component is built lazily on first access and then shared, so the
+    Vosk model, spaCy/transformers pipelines, embeddings and FAISS index are
+    loaded once per process instead of once per request. ``warm_up`` builds
+    everything eagerly and flips ``ready`` when it is done.
+    """
+
+    def __init__(self, vosk_model_path="./vosk-model-small-en-us-0.15",
+                 data_path="./data/financial_data.csv",
+                 db_path="/app/db/financial_data.db",
+                 embedding_model="all-MiniLM-L6-v2",
+                 intent_engine="bart",
+                 stt_mode="open"):
+        self.vosk_model_path = vosk_model_path
+        self.data_path = data_path
+        self.db_path = db_path
+        self.embedding_model = embedding_model
+        self.intent_engine = intent_engine
+        self.stt_mode = (stt_mode or "open").lower()
+        self.ready = False
+        self.warming = False
+        self.errors = {}
+        self.load_times = {}
+        self._components = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._factories = {
+            "embedder": lambda: Embedder(model_name=self.embedding_model),
+            "endpoints": FMPEndpoints,
+            "classifier": self._build_classifier,
+            "metric_store": lambda: MetricStore.from_file(self.data_path),
+            "retriever": lambda: Retriever(file_path=self.data_path, embedder=self.embedder,
+                                           metric_store=self.metric_store),
+            "sql_db": lambda: SQL_Key_Pair(file_path=self.data_path, db_path=self.db_path, embedder=self.embedder,
+                                           metric_store=self.metric_store),
+            "stt": self._build_stt,
+            "transcriber": lambda: TranscriptionService(self.stt),
+        }
+
+    def _build_classifier(self):
+        """
+        Build the intent classifier selected by ``intent_engine``:
+        "bart" (zero-shot BART-MNLI), "distilbert" (zero-shot DistilBERT-MNLI)
+        or "centroid" / "knn" (nearest example utterances, using the shared embedder).
+        """
+        engine = (self.intent_engine or "bart").lower()
+        if engine == "distilbert":
+            return TextClassifier()
+        if engine in ("centroid", "knn"):
+            return IntentClassifier(intent_model=CentroidIntentClassifier(self.embedder, method=engine))
+        if engine != "bart":
+            print(f"Unknown intent engine '{engine}', using bart.")
+        return IntentClassifier()
+
+    def _build_stt(self):
+        """
+        Build the speech model; STT_MODE=grammar adds finance-constrained decoding.
+        """
+        grammar = build_finance_grammar() if self.stt_mode == "grammar" else None
+        return SpeechToText(model_path=self.vosk_model_path, grammar=grammar)
+
+    def _lock_for(self, name):
+        with self._locks_guard:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name):
+        """
+        Return the shared instance of a component, building it on first use.
+
+        Args:
+            name (str): One of the registered component names.
+
+        Returns:
+            object: The shared component instance.
+        """
+        component = self._components.get(name)
+        if component is not None:
+            return component
+        if name not in self._factories:
+            raise KeyError(f"Unknown component: {name}")
+        # One lock per component so a slow model load does not block the others
+        with self._lock_for(name):
+            component = self._components.get(name)
+            if component is None:
+                start = time.perf_counter()
+                component = self._factories[name]()
+                self.load_times[name] = round(time.perf_counter() - start, 3)
+                self._components[name] = component
+                print(f"Loaded component '{name}' in {self.load_times[name]}s")
+        return component
+
+    def loaded(self):
+        """
+        Return the names of the components that have been built so far.
+        """
+        return set(self._components)
+
+    @property
+    def embedder(self):
+        return self.get("embedder")
+
+    @property
+    def endpoints(self):
+        return self.get("endpoints")
+
+    @property
+    def classifier(self):
+        return self.get("classifier")
+
+    @property
+    def metric_store(self):
+        return self.get("metric_store")
+
+    @property
+    def retriever(self):
+        return self.get("retriever")
+
+    @property
+    def sql_db(self):
+        return self.get("sql_db")
+
+    @property
+    def stt(self):
+        return self.get("stt")
+
+    @property
+    def transcriber(self):
+        return self.get("transcriber")
+
+    def warm_up(self, names=None):
+        """
+        Eagerly build components so the first request does not pay for them.
+
+        Args:
+            names (list of str, optional): Components to build. Defaults to all.
+
+        Returns:
+            bool: True if every component loaded successfully.
+        """
+        self.warming = True
+        self.errors = {}
+        for name in names or list(self._factories):
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"Failed to load component '{name}': {e}")
+                self.errors[name] = str(e)
+        self.warming = False
+        self.ready = not self.errors
+        return self.ready
+
+    def status(self):
+        """
+        Describe the warm-up state for the readiness endpoint.
+        """
+        if self.ready:
+            state = "ready"
+        elif self.warming:
+            state = "warming"
+        elif self.errors:
+            state = "failed"
+        else:
+            state = "cold"
+        return {
+            "status": state,
+            "loaded": sorted(self.loaded()),
+            "load_times": dict(self.load_times),
+            "errors": dict(self.errors),
+        }
+
+    def stats(self):
+        """
+        Collect runtime counters from the shared components.
+        """
+        stats = {
+            "fmp": FMPEndpoints.stats(),
+            "web_search": {"singleflight": web_search_flight.stats()},
+        }
+        if "embedder" in self._components:
+            stats["embedder"] = self.embedder.cache_stats()
+        if "transcriber" in self._components:
+            stats["transcription"] = self.transcriber.stats()
+            stats["transcription"]["grammar"] = dict(self.stt.grammar_stats, mode=self.stt_mode)
+            stats["transcription"]["vad"] = dict(self.stt.vad_stats, enabled=self.stt.vad)
+        if "classifier" in self._components:
+            stats["intent_cascade"] = self.classifier.cascade.stats()
+            stats["intent_cascade"]["engine"] = self.intent_engine
+            stats["entities"] = self.classifier.entity_extractor.stats()
+        return stats
+
+    def close(self):
+        """
+        Flush state that should survive a restart. Called from the app's shutdown hook.
+        """
+        if "embedder" in self._components:
+            self.embedder.save_cache()
+        if "transcriber" in self._components:
+            self.transcriber.shutdown()
+
+
+registry = ComponentRegistry(
+    vosk_model_path=os.getenv("VOSK_MODEL_PATH", "./vosk-model-small-en-us-0.15"),
+    data_path=os.getenv("FINANCIAL_DATA_PATH", "./data/financial_data.csv"),
+    db_path=os.getenv("FINANCIAL_DB_PATH", "/app/db/financial_data.db"),
+    intent_engine=os.getenv("INTENT_ENGINE", "bart"),
+    stt_mode=os.getenv("STT_MODE", "open"),
+)
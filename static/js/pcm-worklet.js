@@ -0,0 +1,108 @@
+// static/js/pcm-worklet.js
+// Converts microphone audio to 16 kHz mono 16-bit PCM, the format SpeechToText decodes,
+// so uploads need no server-side conversion. Posts an Int16 ArrayBuffer about every 100 ms;
+// send {command: "flush"} to get the remaining samples.
+const TARGET_RATE = 16000;
+const CHUNK_SAMPLES = 1600;
+const FILTER_TAPS = 63;
+
+// Windowed-sinc (Blackman) low-pass at 0.45 * TARGET_RATE, so content above the
+// 8 kHz Nyquist limit of the output is removed instead of aliasing into speech
+function lowPassTaps(inputRate) {
+    const cutoff = (0.45 * TARGET_RATE) / inputRate;
+    const middle = (FILTER_TAPS - 1) / 2;
+    const taps = new Float32Array(FILTER_TAPS);
+    let sum = 0;
+    for (let n = 0; n < FILTER_TAPS; n++) {
+        const x = n - middle;
+        const sinc = x === 0 ? 2 * cutoff : Math.sin(2 * Math.PI * cutoff * x) / (Math.PI * x);
+        const window = 0.42 - 0.5 * Math.cos((2 * Math.PI * n) / (FILTER_TAPS - 1))
+            + 0.08 * Math.cos((4 * Math.PI * n) / (FILTER_TAPS - 1));
+        taps[n] = sinc * window;
+        sum += taps[n];
+    }
+    return taps.map((tap) => tap / sum);
+}
+
+class PcmDownsampler extends AudioWorkletProcessor {
+    constructor() {
+        super();
+        this.step = sampleRate / TARGET_RATE; // input samples per output sample
+        // Only needed when the AudioContext did not already run at 16 kHz
+        this.taps = this.step > 1 ? lowPassTaps(sampleRate) : null;
+        this.history = new Float32Array(FILTER_TAPS - 1); // last inputs of the previous block
+        this.position = 0;                    // fractional read position into the current block
+        this.previous = 0;                    // last input sample of the previous block
+        this.buffer = new Int16Array(CHUNK_SAMPLES);
+        this.length = 0;
+        this.port.onmessage = (event) => {
+            if (event.data && event.data.command === "flush") {
+                this.post();
+                this.port.postMessage({ flushed: true });
+            }
+        };
+    }
+
+    post() {
+        if (this.length > 0) {
+            const chunk = this.buffer.slice(0, this.length);
+            this.port.postMessage(chunk.buffer, [chunk.buffer]);
+            this.length = 0;
+        }
+    }
+
+    lowPass(mono) {
+        const frames = mono.length;
+        const width = this.history.length;
+        const input = new Float32Array(width + frames);
+        input.set(this.history);
+        input.set(mono, width);
+        const output = new Float32Array(frames);
+        for (let i = 0; i < frames; i++) {
+            let acc = 0;
+            for (let t = 0; t < FILTER_TAPS; t++) {
+                acc += this.taps[t] * input[i + t];
+            }
+            output[i] = acc;
+        }
+        this.history = input.slice(frames);
+        return output;
+    }
+
+    process(inputs) {
+        const channels = inputs[0];
+        if (!channels || channels.length === 0) {
+            return true;
+        }
+
+        // Mix down to mono
+        const frames = channels[0].length;
+        const mono = new Float32Array(frames);
+        for (const channel of channels) {
+            for (let i = 0; i < frames; i++) {
+                mono[i] += channel[i] / channels.length;
+            }
+        }
+
+        const signal = this.taps ? this.lowPass(mono) : mono;
+
+        // Linear interpolation between neighbouring input samples; index -1 is the previous block's last sample
+        while (this.position < frames - 1) {
+            const index = Math.floor(this.position);
+            const fraction = this.position - index;
+            const left = index < 0 ? this.previous : signal[index];
+            const value = left + (signal[index + 1] - left) * fraction;
+            const clipped = Math.max(-1, Math.min(1, value));
+            this.buffer[this.length++] = clipped < 0 ? clipped * 0x8000 : clipped * 0x7fff;
+            if (this.length === CHUNK_SAMPLES) {
+                this.post();
+            }
+            this.position += this.step;
+        }
+        this.position -= frames;
+        this.previous = signal[frames - 1];
+        return true;
+    }
+}
+
+registerProcessor("pcm-downsampler", PcmDownsampler);
@@ -0,0 +1,48 @@
+# tests/test_intent_cascade.py
+import pytest
+from voice.intent_cascade import IntentCascade
+from voice.keyword_matcher import INTENT_MATCHER, KeywordMatcher
+
+
+def model_fn(text):
+    return "model"
+
+
+@pytest.fixture(scope="module")
+def cascade():
+    return IntentCascade(INTENT_MATCHER, model_fn, threshold=0.75)
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("Interest expense of Apple", "get_interest"),
+    ("What are Ford's interest payments?", "get_interest"),
+    ("Apple research and development expenses", "get_research_info"),
+    ("What is Intel's R&D budget?", "get_research_info"),
+    ("Total costs of Tesla", "get_cost_info"),
+    ("How much did Walmart spend on operating expenses?", "get_cost_info"),
+    ("How much tax did Apple pay?", "get_income_tax"),
+    ("Income tax of Amazon in 2021", "get_income_tax"),
+    ("How much did Nvidia earn per share?", "get_earnings_per_share"),
+    ("Tesla market cap in 2021", "get_market_cap"),
+])
+def test_keywords_answer_confidently(cascade, text, intent):
+    assert cascade.classify(text) == intent
+
+
+@pytest.mark.parametrize("text", [
+    "What is Apple's cost of revenue?",
+    "How much did Microsoft earn in profit?",
+    "Microsoft share price in January 2020",
+    "What did Amazon stock trade at in 2018?",
+    "Apple stock price two years ago",
+])
+def test_contradicted_keywords_go_to_model(cascade, text):
+    assert cascade.classify(text) == "model"
+
+
+def test_longer_metric_keyword_contradicts_intent():
+    # Without a cost intent, "revenue" is the only match and would win outright
+    cascade = IntentCascade(KeywordMatcher({"get_revenue": ["revenue"]}), model_fn, threshold=0.75)
+    assert cascade.keyword_stage("What is Apple's revenue?") == ("get_revenue", 1.0)
+    intent, confidence = cascade.keyword_stage("What is Apple's cost of revenue?")
+    assert intent == "get_revenue" and confidence < cascade.threshold
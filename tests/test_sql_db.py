@@ -0,0 +1,57 @@
+# tests/test_sql_db.py
+import os
+import numpy as np
+import pytest
+from rag.sql_db import SQL_Key_Pair
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "financial_data.csv")
+
+
+class FakeEmbedder:
+    """Fixed-size vectors so the store loads without the sentence-transformers model."""
+
+    model_name = "fake"
+
+    def embed(self, texts):
+        return np.ones((len(texts), 8), dtype="float32")
+
+
+@pytest.fixture(autouse=True)
+def index_dir(tmp_path, monkeypatch):
+    # Keep the persisted FAISS index out of the default /app/cache/rag_index
+    monkeypatch.setenv("RAG_INDEX_DIR", str(tmp_path / "rag_index"))
+
+
+def load_store(tmp_path, file_path=DATA_PATH):
+    return SQL_Key_Pair(file_path=file_path, db_path=str(tmp_path / "financial_data.db"), embedder=FakeEmbedder())
+
+
+def test_loads_shipped_csv(tmp_path):
+    store = load_store(tmp_path)
+    assert store.query_db("AAPL", "revenue") == "revenue for AAPL: $81.43 billion."
+
+
+def test_ingest_matches_tickers_and_metrics_case_insensitively(tmp_path):
+    load_store(tmp_path).db_conn.close()
+    other = tmp_path / "other.csv"
+    other.write_text("Year,firm,Ticker,Revenue\n2025,Apple,aapl,1000000000\n", encoding="utf-8")
+
+    store = load_store(tmp_path, str(other))
+    rows = store.db_conn.execute("""
+        SELECT c.ticker, m.name, f.period FROM financial_facts f
+        JOIN companies c ON c.id = f.company_id
+        JOIN metrics m ON m.id = f.metric_id
+        JOIN sources s ON s.id = f.source_id
+        WHERE s.file = ?
+    """, (other.name,)).fetchall()
+    assert rows == [("AAPL", "revenue", "2025")]
+
+
+def test_reload_is_idempotent(tmp_path):
+    store = load_store(tmp_path)
+    count = store.db_conn.execute("SELECT COUNT(*) FROM financial_facts").fetchone()[0]
+    assert count > 0
+    store.db_conn.close()
+
+    store = load_store(tmp_path)
+    assert store.db_conn.execute("SELECT COUNT(*) FROM financial_facts").fetchone()[0] == count
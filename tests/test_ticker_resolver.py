@@ -0,0 +1,58 @@
+# tests/test_ticker_resolver.py
+import pytest
+from voice.ticker_resolver import get_default_resolver
+
+
+@pytest.fixture(scope="module")
+def resolver():
+    return get_default_resolver()
+
+
+@pytest.mark.parametrize("text, ticker", [
+    ("WHAT IS ALL THE REVENUE OF TESLA", "TSLA"),
+    ("What is IT spending at Microsoft", "MSFT"),
+    ("What is the revenue of AAPL in 2023", "AAPL"),
+    ("What did GE earn last year", "GE"),
+])
+def test_find_in_text(resolver, text, ticker):
+    assert resolver.find_in_text(text) == ticker
+
+
+@pytest.mark.parametrize("text", [
+    "What is ALL the revenue",
+    "WHAT IS THE REVENUE OF AAPL",
+])
+def test_find_in_text_ignores_ambiguous_upper_case(resolver, text):
+    assert resolver.find_in_text(text) is None
+
+
+@pytest.mark.parametrize("name, ticker", [
+    ("Exxon", "XOM"),
+    ("Berkshire", "BRK-B"),
+    ("JPMorgan", "JPM"),
+    ("Goldman", "GS"),
+    ("amazn", "AMZN"),
+])
+def test_resolve_prefers_name_matches(resolver, name, ticker):
+    assert resolver.best(name)[0] == ticker
+
+
+@pytest.mark.parametrize("text, ticker", [
+    ("what is the revenue of a a p l", "AAPL"),
+    ("show me i b m revenue", "IBM"),
+    ("what was b r k b stock price", "BRK-B"),
+    ("revenue of three m", "MMM"),
+    ("phillips sixty six net income", "PSX"),
+])
+def test_find_in_text_spoken_forms(resolver, text, ticker):
+    assert resolver.find_in_text(text) == ticker
+
+
+def test_finance_grammar_spells_numbers():
+    from voice.finance_grammar import build_finance_grammar
+
+    grammar = build_finance_grammar()
+    assert "three m" in grammar
+    assert "phillips sixty six" in grammar
+    assert "m" not in grammar
+    assert "a a p l" in grammar
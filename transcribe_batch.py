@@ -0,0 +1,170 @@
+# transcribe_batch.py
+"""
+Transcribe a directory or glob of recorded audio on a process pool and write JSONL.
+
+Usage:
+    python transcribe_batch.py recordings/ > transcripts.jsonl
+    python transcribe_batch.py "calls/2024-*/*.webm" -o transcripts.jsonl --workers 8
+    python transcribe_batch.py voicemail/ --answer --use-retriever
+
+Every worker process loads the Vosk model once (STT_MODE=grammar adds the
+finance grammar) and decodes files independently, so throughput grows with the
+number of cores. WAVs that are already 16 kHz mono 16-bit are read directly;
+anything else is decoded by ffmpeg inside the worker. With --answer, each
+transcript is also run through process_query in this process.
+
+Each output line holds "file", "text", "audio_seconds", "worker" and a
+"timings" object (decode_s, transcribe_s, total_s, rtf, plus answer_s with
+--answer), or "error" if the file could not be transcribed. Lines are written
+as files finish, not in input order.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from voice.audio_decode import load_pcm
+
+AUDIO_EXTENSIONS = (".wav", ".webm", ".ogg", ".opus", ".mp3", ".m4a", ".flac", ".aac", ".amr")
+SAMPLE_RATE = 16000
+
+# The per-process speech model, set by _init_worker
+_stt = None
+
+
+def find_audio_files(target):
+    """
+    Return the audio files under a directory (recursively), or those matching a glob, sorted.
+    """
+    if os.path.isdir(target):
+        paths = glob.glob(os.path.join(target, "**", "*"), recursive=True)
+    else:
+        paths = glob.glob(target, recursive=True)
+    return sorted(p for p in paths if os.path.isfile(p) and p.lower().endswith(AUDIO_EXTENSIONS))
+
+
+def _init_worker(model_path, stt_mode):
+    global _stt
+    # The speech modules log with print(); keep that out of the JSONL on stdout
+    sys.stdout = sys.stderr
+    from voice.speech_to_text import SpeechToText
+    grammar = None
+    if stt_mode == "grammar":
+        from voice.finance_grammar import build_finance_grammar
+        grammar = build_finance_grammar()
+    _stt = SpeechToText(model_path=model_path, grammar=grammar)
+
+
+def transcribe_path(path):
+    """
+    Decode and transcribe one file in a worker process.
+    """
+    record = {"file": path, "worker": os.getpid()}
+    start = time.perf_counter()
+    try:
+        pcm = load_pcm(path, SAMPLE_RATE)
+    except Exception as e:
+        record["error"] = f"Decode failed: {e}"
+        return record
+    decoded = time.perf_counter()
+    text = _stt.transcribe_pcm(pcm, SAMPLE_RATE)
+    done = time.perf_counter()
+
+    audio_seconds = len(pcm) / 2 / SAMPLE_RATE
+    record["text"] = text
+    record["audio_seconds"] = round(audio_seconds, 3)
+    record["timings"] = {
+        "decode_s": round(decoded - start, 4),
+        "transcribe_s": round(done - decoded, 4),
+        "total_s": round(done - start, 4),
+        "rtf": round((done - start) / audio_seconds, 4) if audio_seconds else None,
+    }
+    if text is None:
+        record["error"] = "Recognition failed."
+    return record
+
+
+async def run(paths, pool, out, answer, use_retriever, concurrency):
+    loop = asyncio.get_running_loop()
+    process_query = None
+    if answer:
+        from main import process_query
+    slots = asyncio.Semaphore(concurrency)
+    totals = {"files": 0, "failed": 0, "audio_seconds": 0.0, "worker_seconds": 0.0}
+
+    async def handle(path):
+        record = await loop.run_in_executor(pool, transcribe_path, path)
+        if process_query and record.get("text"):
+            async with slots:
+                start = time.perf_counter()
+                record["answer"] = await process_query(query_text=record["text"], use_retriever=use_retriever)
+                record["timings"]["answer_s"] = round(time.perf_counter() - start, 4)
+        return record
+
+    try:
+        for next_record in asyncio.as_completed([handle(p) for p in paths]):
+            record = await next_record
+            totals["files"] += 1
+            totals["failed"] += "error" in record
+            totals["audio_seconds"] += record.get("audio_seconds", 0.0)
+            totals["worker_seconds"] += record.get("timings", {}).get("total_s", 0.0)
+            out.write(json.dumps(record, default=str) + "\n")
+            out.flush()
+    finally:
+        if answer:
+            from api.endpoints import FMPEndpoints
+            from registry import registry
+            await FMPEndpoints.aclose()
+            registry.close()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe recorded audio files in parallel.")
+    parser.add_argument("input", help="Directory (searched recursively) or glob of audio files")
+    parser.add_argument("-o", "--output", help="JSONL output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: TRANSCRIBE_WORKERS or the CPU count)")
+    parser.add_argument("--model", default=os.getenv("VOSK_MODEL_PATH", "./vosk-model-small-en-us-0.15"))
+    parser.add_argument("--stt-mode", default=os.getenv("STT_MODE", "open"), choices=["open", "grammar"])
+    parser.add_argument("--answer", action="store_true", help="Run each transcript through process_query")
+    parser.add_argument("--use-retriever", action="store_true", help="Also query the CSV store when the API answers")
+    parser.add_argument("--concurrency", type=int, default=None, help="Concurrent answers with --answer (default: BATCH_CONCURRENCY or 8)")
+    args = parser.parse_args()
+
+    paths = find_audio_files(args.input)
+    if not paths:
+        print(f"No audio files found for {args.input}", file=sys.stderr)
+        sys.exit(1)
+    workers = args.workers or int(os.getenv("TRANSCRIBE_WORKERS", str(os.cpu_count() or 1)))
+    workers = min(workers, len(paths))
+    concurrency = args.concurrency or int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+    # process_query (--answer) and its components log with print(); keep the real stdout
+    # for the JSONL records only, as the workers do in _init_worker
+    results = sys.stdout
+    sys.stdout = sys.stderr
+    out = open(args.output, "w", encoding="utf-8") if args.output else results
+    start = time.perf_counter()
+    # spawn: workers must not inherit the event loop's threads or a half-loaded model
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker, initargs=(args.model, args.stt_mode))
+    try:
+        totals = asyncio.run(run(paths, pool, out, args.answer, args.use_retriever, concurrency))
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        if out is not results:
+            out.close()
+    elapsed = time.perf_counter() - start
+    speed = totals["audio_seconds"] / elapsed if elapsed else 0.0
+    efficiency = totals["worker_seconds"] / (elapsed * workers) if elapsed else 0.0
+    print(f"Transcribed {totals['files']} files ({totals['failed']} failed, {totals['audio_seconds']:.1f}s of audio) "
+          f"in {elapsed:.1f}s with {workers} workers: {speed:.1f}x real time, {efficiency:.0%} worker utilization",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
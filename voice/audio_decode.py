@@ -0,0 +1,131 @@
+# voice/audio_decode.py
+import array
+import asyncio
+import io
+import os
+import subprocess
+import sys
+import wave
+
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+DECODE_TIMEOUT = float(os.getenv("AUDIO_DECODE_TIMEOUT", "30"))
+
+
+class AudioDecodeError(Exception):
+    """Raised when uploaded audio cannot be decoded to PCM."""
+
+
+def ffmpeg_command(sample_rate=16000):
+    """
+    ffmpeg arguments that read any container from stdin and write mono s16le PCM to stdout.
+    """
+    return [
+        FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-nostdin",
+        "-i", "pipe:0",
+        "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate),
+        "pipe:1",
+    ]
+
+
+def wav_pcm(data, sample_rate=16000):
+    """
+    Return the samples of a WAV that is already mono 16-bit at ``sample_rate``, else None.
+
+    Such files are what SpeechToText decodes, so they need no ffmpeg pass.
+    """
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wf:
+            if wf.getnchannels() == 1 and wf.getsampwidth() == 2 and wf.getframerate() == sample_rate:
+                return wf.readframes(wf.getnframes())
+    except (wave.Error, EOFError):
+        pass
+    return None
+
+
+def l16_pcm(data, content_type, sample_rate=16000):
+    """
+    Return the samples of an ``audio/L16`` body at ``sample_rate`` with one channel, else None.
+
+    L16 (RFC 2586) is big-endian, so the samples are byte-swapped to s16le.
+    """
+    if not content_type:
+        return None
+    parts = [part.strip().lower() for part in content_type.split(";")]
+    if parts[0] != "audio/l16":
+        return None
+    params = dict(part.split("=", 1) for part in parts[1:] if "=" in part)
+    if params.get("rate") != str(sample_rate) or params.get("channels", "1") != "1" or len(data) % 2:
+        return None
+    samples = array.array("h", data)
+    if sys.byteorder == "little":
+        samples.byteswap()
+    return samples.tobytes()
+
+
+def upload_pcm(data, content_type=None, sample_rate=16000):
+    """
+    Return PCM for uploads already in the recognizer's format (16-bit mono WAV or
+    ``audio/L16`` at ``sample_rate``), or None if the upload needs decode_to_pcm.
+    """
+    pcm = l16_pcm(data, content_type, sample_rate)
+    return pcm if pcm is not None else wav_pcm(data, sample_rate)
+
+
+def load_pcm(path, sample_rate=16000, timeout=None):
+    """
+    Read an audio file as mono s16le PCM, decoding with ffmpeg only when it is not a matching WAV.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    pcm = wav_pcm(data, sample_rate)
+    return pcm if pcm is not None else decode_to_pcm(data, sample_rate, timeout)
+
+
+def decode_to_pcm(data, sample_rate=16000, timeout=None):
+    """
+    Decode encoded audio bytes (WebM/Opus, OGG, MP3, WAV, ...) to 16-bit mono PCM in memory.
+
+    Args:
+        data (bytes): Encoded audio.
+        sample_rate (int): Output sample rate.
+        timeout (float, optional): Seconds before ffmpeg is killed. Defaults to AUDIO_DECODE_TIMEOUT.
+
+    Returns:
+        bytes: Raw s16le PCM.
+    """
+    if not data:
+        raise AudioDecodeError("No audio data received.")
+    try:
+        result = subprocess.run(ffmpeg_command(sample_rate), input=data, capture_output=True,
+                                timeout=timeout or DECODE_TIMEOUT)
+    except FileNotFoundError:
+        raise AudioDecodeError(f"ffmpeg not found ({FFMPEG_BINARY}).")
+    except subprocess.TimeoutExpired:
+        raise AudioDecodeError("Audio decoding timed out.")
+    if result.returncode != 0:
+        raise AudioDecodeError(f"ffmpeg failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+    return result.stdout
+
+
+async def adecode_to_pcm(data, sample_rate=16000, timeout=None):
+    """
+    Async version of decode_to_pcm: the ffmpeg pipe is driven by the event loop, not a thread.
+    """
+    if not data:
+        raise AudioDecodeError("No audio data received.")
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *ffmpeg_command(sample_rate),
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+    except FileNotFoundError:
+        raise AudioDecodeError(f"ffmpeg not found ({FFMPEG_BINARY}).")
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(data), timeout=timeout or DECODE_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise AudioDecodeError("Audio decoding timed out.")
+    if process.returncode != 0:
+        raise AudioDecodeError(f"ffmpeg failed: {stderr.decode('utf-8', 'replace').strip()}")
+    return stdout
@@ -0,0 +1,215 @@
+# voice/centroid_classifier.py
+import numpy as np
+
+# Curated example utterances per intent. Keep them short and varied; the
+# centroids are recomputed from this table at startup.
+INTENT_EXAMPLES = {
+    "get_net_income": [
+        "What is Apple's net income?",
+        "How much profit did Microsoft make last year?",
+        "Net earnings of Tesla in 2023",
+        "What were Amazon's earnings?",
+        "Show me the bottom line for Nvidia",
+        "How much money did Google make after expenses?",
+    ],
+    "get_revenue": [
+        "What is the revenue of Microsoft?",
+        "How much did Apple sell in 2022?",
+        "Total sales of Walmart",
+        "What was Amazon's turnover last year?",
+        "Top line for Meta",
+        "How much revenue does Netflix bring in?",
+    ],
+    "get_stock_price": [
+        "What is the current stock price of Tesla?",
+        "How much is one Apple share right now?",
+        "Price of Nvidia stock today",
+        "What's Microsoft trading at?",
+        "Current share price of Amazon",
+        "How much does Google stock cost now?",
+    ],
+    "get_profit_margin": [
+        "What is Nvidia's profit margin?",
+        "Net margin of Apple",
+        "How profitable is Microsoft as a percentage of sales?",
+        "What percentage of revenue does Tesla keep as profit?",
+        "Profit margin for Coca-Cola in 2023",
+        "How high are Adobe's margins?",
+    ],
+    "get_company_profile": [
+        "Who is the CEO of Apple?",
+        "Tell me about Microsoft",
+        "Company profile of Tesla",
+        "What does Nvidia do?",
+        "Which sector is Pfizer in?",
+        "Where is Amazon headquartered?",
+    ],
+    "get_market_cap": [
+        "What is the market cap of Google?",
+        "How much is Apple worth?",
+        "Market capitalization of Microsoft",
+        "What is Tesla's valuation?",
+        "Total company value of Nvidia",
+        "How big is Meta by market value?",
+    ],
+    "get_historical_stock_price": [
+        "What was Apple's stock price on 2023-01-05?",
+        "Tesla share price in March 2021",
+        "Past stock price of Microsoft",
+        "How much did Amazon stock cost on January 3, 2020?",
+        "Historical price of Nvidia shares last June",
+        "Where was Google stock trading at the end of 2019?",
+    ],
+    "get_dividend_info": [
+        "What is Coca-Cola's dividend yield?",
+        "Does Apple pay a dividend?",
+        "Dividend payout ratio of Johnson & Johnson",
+        "How much dividend does Microsoft pay per share?",
+        "When is the next dividend for Procter & Gamble?",
+        "Dividend info for AT&T",
+    ],
+    "get_balance_sheet": [
+        "Show me Walmart's balance sheet",
+        "What are Apple's total assets and liabilities?",
+        "Financial position of Microsoft",
+        "How much debt and equity does Tesla have?",
+        "Balance sheet of Amazon for 2022",
+        "What does Nvidia own and owe?",
+    ],
+    "get_cash_flow": [
+        "What is Amazon's cash flow from operations?",
+        "Operating cash flow of Apple",
+        "How much cash did Microsoft generate?",
+        "Free cash flow for Tesla",
+        "Cash flow statement of Google",
+        "How much cash came in from Meta's business last year?",
+    ],
+    "get_financial_ratios": [
+        "What is Visa's current ratio?",
+        "Financial ratios for Apple",
+        "Debt to equity ratio of Tesla",
+        "Liquidity ratios of Microsoft",
+        "What is Amazon's quick ratio?",
+        "Show me the key ratios for Nvidia",
+    ],
+    "get_earnings_per_share": [
+        "What is the EPS of Meta?",
+        "Earnings per share for Apple",
+        "How much did Microsoft earn per share?",
+        "Diluted EPS of Tesla in 2023",
+        "Per share earnings of Nvidia",
+        "What was Amazon's earnings per share last quarter?",
+    ],
+    "get_interest": [
+        "What is Apple's interest expense?",
+        "How much interest does Tesla pay on its debt?",
+        "Interest payments of Microsoft",
+        "Interest costs for Boeing in 2022",
+        "How much did Ford spend on interest?",
+        "Net interest expense of AT&T",
+    ],
+    "get_research_info": [
+        "How much does Apple spend on research and development?",
+        "R&D spending of Microsoft",
+        "Research expenses of Nvidia",
+        "What is Alphabet's research and development budget?",
+        "How much did Pfizer invest in research?",
+        "Development costs of Intel",
+    ],
+    "get_cost_info": [
+        "What are Tesla's total costs?",
+        "Cost of revenue for Apple",
+        "How much did Amazon spend on operating costs?",
+        "Total cost of goods sold for Walmart",
+        "What are Microsoft's expenses?",
+        "Operating expenses of Netflix",
+    ],
+    "get_income_tax": [
+        "How much income tax did Apple pay?",
+        "Tax expense of Microsoft",
+        "What is Amazon's effective tax rate?",
+        "Income taxes paid by Google in 2022",
+        "Provision for income taxes of Tesla",
+        "How much did Nvidia pay in taxes?",
+    ],
+}
+
+
+class CentroidIntentClassifier:
+    """
+    Intent classification by nearest centroid in sentence-embedding space.
+
+    Example utterances for each intent are embedded once at construction time.
+    A query then costs one embedding plus a matrix-vector product against the
+    normalized class centroids (or against every exemplar for k-NN voting),
+    instead of one NLI forward pass per candidate label.
+    """
+
+    def __init__(self, embedder, examples=None, method="centroid", k=5):
+        """
+        Args:
+            embedder (Embedder): Shared sentence embedder.
+            examples (dict, optional): intent -> list of example utterances.
+                Defaults to INTENT_EXAMPLES.
+            method (str): "centroid" or "knn".
+            k (int): Neighbours to vote over when method is "knn".
+        """
+        if method not in ("centroid", "knn"):
+            raise ValueError("method must be 'centroid' or 'knn'")
+        self.embedder = embedder
+        self.method = method
+        self.k = k
+        examples = examples or INTENT_EXAMPLES
+        self.intents = list(examples)
+
+        texts = []
+        labels = []
+        for label, (intent, utterances) in enumerate(examples.items()):
+            texts.extend(utterances)
+            labels.extend([label] * len(utterances))
+        self.exemplars = self._normalize(embedder.embed(texts))
+        self.labels = np.array(labels)
+
+        centroids = np.vstack([
+            self.exemplars[self.labels == label].mean(axis=0) for label in range(len(self.intents))
+        ])
+        self.centroids = self._normalize(centroids)
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def predict_batch(self, texts):
+        """
+        Classify several texts with a single embedding call.
+
+        Returns:
+            list of tuple: (intent, cosine similarity) per text.
+        """
+        if not texts:
+            return []
+        queries = self._normalize(self.embedder.embed(list(texts)))
+        if self.method == "centroid":
+            scores = queries @ self.centroids.T
+            best = scores.argmax(axis=1)
+            return [(self.intents[b], float(scores[i, b])) for i, b in enumerate(best)]
+
+        scores = queries @ self.exemplars.T
+        k = min(self.k, scores.shape[1])
+        neighbours = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for i, row in enumerate(neighbours):
+            # Similarity-weighted vote over the k nearest exemplars
+            votes = np.bincount(self.labels[row], weights=scores[i, row], minlength=len(self.intents))
+            best = int(votes.argmax())
+            results.append((self.intents[best], float(scores[i, row][self.labels[row] == best].max())))
+        return results
+
+    def predict(self, text):
+        """
+        Return (intent, cosine similarity) for a single text.
+        """
+        return self.predict_batch([text])[0]
@@ -0,0 +1,199 @@
+# voice/entity_extractor.py
+import datetime
+import re
+import threading
+import time
+from dateutil.parser import parse
+from .keyword_matcher import METRIC_MATCHER
+
+# spaCy pipes we never use; en_core_web_* NER has its own tok2vec, so it runs alone
+NON_NER_PIPES = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+
+MONTH = r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+DAY = r"\d{1,2}(?:st|nd|rd|th)?"
+DATE_PATTERNS = [
+    re.compile(r"\b\d{4}-\d{1,2}-\d{1,2}\b"),                              # 2023-01-05
+    re.compile(r"\b\d{1,2}/\d{1,2}/\d{4}\b"),                              # 01/05/2023
+    re.compile(rf"\b{MONTH}\s+{DAY},?\s+\d{{4}}\b", re.IGNORECASE),        # January 5, 2023
+    re.compile(rf"\b{DAY}\s+(?:of\s+)?{MONTH},?\s+\d{{4}}\b", re.IGNORECASE),  # 5th of January 2023
+    re.compile(rf"\b{MONTH},?\s+\d{{4}}\b", re.IGNORECASE),                # March 2021
+]
+YEAR_PATTERN = re.compile(r"\b(?:fy\s?)?((?:19|20)\d{2})\b", re.IGNORECASE)
+RELATIVE_YEAR_PATTERN = re.compile(r"\b(this|current|last|previous|past|next)\s+(?:fiscal\s+)?year\b", re.IGNORECASE)
+YEARS_AGO_PATTERN = re.compile(r"\b(\d+|one|two|three|four|five)\s+years?\s+ago\b", re.IGNORECASE)
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5}
+RELATIVE_OFFSETS = {"this": 0, "current": 0, "last": -1, "previous": -1, "past": -1, "next": 1}
+
+
+class EntityExtractor:
+    """
+    Extract ticker, metric, year and date from a question.
+
+    Rules and the company gazetteer (TickerResolver) run first and cover the
+    usual "metric of company in year" questions in microseconds. spaCy NER is
+    only consulted when the rules find no company; its ORG spans go through
+    the same resolver and its DATE spans fill a year/date the rules missed.
+    """
+
+    def __init__(self, resolver, nlp=None, current_year=None):
+        """
+        Args:
+            resolver (TickerResolver): Company name / ticker gazetteer.
+            nlp (spacy.Language, optional): NER-only pipeline for the fallback.
+            current_year (int, optional): Anchor for "this year" / "last year".
+                Defaults to the current calendar year at call time.
+        """
+        self.resolver = resolver
+        self.nlp = nlp
+        self.current_year = current_year
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "rules_only": 0, "spacy_fallbacks": 0, "rules_ms": 0.0, "spacy_ms": 0.0}
+
+    def _year_now(self):
+        return self.current_year or datetime.date.today().year
+
+    def _apply_date_text(self, date_text, entities):
+        """
+        Turn a date expression into a year or a YYYY-MM-DD date, as spaCy DATE spans were.
+        """
+        date_text = date_text.lower()
+        try:
+            parsed_date = parse(date_text, fuzzy=True, default=datetime.datetime(self._year_now(), 1, 1))
+            # A bare year, or anything that parses to January 1, is a year
+            if "year" in date_text or date_text.isdigit() or (parsed_date.day == 1 and parsed_date.month == 1):
+                entities["year"] = entities["year"] or parsed_date.strftime("%Y")
+            else:
+                entities["date"] = entities["date"] or parsed_date.strftime("%Y-%m-%d")
+        except (ValueError, OverflowError):
+            pass
+
+    def extract_with_rules(self, text):
+        """
+        Return the entities found by rules and the gazetteer alone.
+        """
+        entities = {"ticker": None, "metric": None, "year": None, "date": None}
+        entities["ticker"] = self.resolver.find_in_text(text)
+        entities["metric"] = METRIC_MATCHER.best(text)
+
+        remaining = text
+        for pattern in DATE_PATTERNS:
+            match = pattern.search(remaining)
+            if match:
+                self._apply_date_text(match.group(0), entities)
+                # Blank the span so its year is not picked up again below
+                remaining = remaining[:match.start()] + " " * len(match.group(0)) + remaining[match.end():]
+                break
+
+        if not entities["year"]:
+            match = YEAR_PATTERN.search(remaining)
+            if match:
+                entities["year"] = match.group(1)
+        if not entities["year"]:
+            match = RELATIVE_YEAR_PATTERN.search(remaining)
+            if match:
+                entities["year"] = str(self._year_now() + RELATIVE_OFFSETS[match.group(1).lower()])
+        if not entities["year"]:
+            match = YEARS_AGO_PATTERN.search(remaining)
+            if match:
+                count = match.group(1).lower()
+                entities["year"] = str(self._year_now() - int(NUMBER_WORDS.get(count, count)))
+        return entities
+
+    def extract_with_spacy(self, text, entities):
+        """
+        Fill missing ticker/year/date from spaCy NER spans.
+        """
+        if self.nlp is None:
+            return entities
+        return self._apply_doc(self.nlp(text), entities)
+
+    def _apply_doc(self, doc, entities):
+        found_date = bool(entities["year"] or entities["date"])
+        for ent in doc.ents:
+            if ent.label_ == "ORG" and not entities["ticker"]:
+                org_name = ent.text.lower()
+                match = self.resolver.best(org_name, min_score=0.5)
+                if match:
+                    ticker, firm, score = match
+                    print(f"Found ticker {ticker} for {org_name} with similarity {score:.2f}")
+                    entities["ticker"] = ticker
+                else:
+                    print(f"No match found for {org_name} with >= 50% similarity. Using fallback ticker.")
+                    entities["ticker"] = ent.text.upper()
+            elif ent.label_ == "DATE" and not found_date:
+                self._apply_date_text(ent.text, entities)
+        if entities["year"] and not re.match(r"^\d{4}$", entities["year"]):
+            entities["year"] = None
+        return entities
+
+    def extract(self, text):
+        """
+        Extract entities, falling back to spaCy only when the rules find no company.
+
+        Returns:
+            dict: {"ticker", "metric", "year", "date"}
+        """
+        start = time.perf_counter()
+        entities = self.extract_with_rules(text)
+        rules_ms = (time.perf_counter() - start) * 1000
+
+        spacy_ms = 0.0
+        fallback = not entities["ticker"] and self.nlp is not None
+        if fallback:
+            start = time.perf_counter()
+            entities = self.extract_with_spacy(text, entities)
+            spacy_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["rules_ms"] += rules_ms
+            if fallback:
+                self._stats["spacy_fallbacks"] += 1
+                self._stats["spacy_ms"] += spacy_ms
+            else:
+                self._stats["rules_only"] += 1
+        return entities
+
+    def extract_batch(self, texts, batch_size=64):
+        """
+        Extract entities for many texts; the spaCy fallbacks share one ``nlp.pipe`` pass.
+
+        Returns:
+            list of dict: One entities dict per text, in order.
+        """
+        start = time.perf_counter()
+        results = [self.extract_with_rules(text) for text in texts]
+        rules_ms = (time.perf_counter() - start) * 1000
+
+        fallback = [i for i, entities in enumerate(results) if not entities["ticker"]] if self.nlp is not None else []
+        spacy_ms = 0.0
+        if fallback:
+            start = time.perf_counter()
+            docs = self.nlp.pipe((texts[i] for i in fallback), batch_size=batch_size)
+            for i, doc in zip(fallback, docs):
+                results[i] = self._apply_doc(doc, results[i])
+            spacy_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self._stats["calls"] += len(texts)
+            self._stats["rules_ms"] += rules_ms
+            self._stats["rules_only"] += len(texts) - len(fallback)
+            self._stats["spacy_fallbacks"] += len(fallback)
+            self._stats["spacy_ms"] += spacy_ms
+        return results
+
+    def stats(self):
+        """
+        Report how often the spaCy fallback ran and what each path costs.
+        """
+        with self._lock:
+            calls = self._stats["calls"]
+            fallbacks = self._stats["spacy_fallbacks"]
+            return {
+                "calls": calls,
+                "rules_only": self._stats["rules_only"],
+                "spacy_fallbacks": fallbacks,
+                "fallback_rate": round(fallbacks / calls, 4) if calls else 0.0,
+                "rules_avg_ms": round(self._stats["rules_ms"] / calls, 3) if calls else 0.0,
+                "spacy_avg_ms": round(self._stats["spacy_ms"] / fallbacks, 3) if fallbacks else 0.0,
+            }
@@ -0,0 +1,66 @@
+# voice/finance_grammar.py
+import re
+from .keyword_matcher import INTENT_KEYWORDS, METRIC_KEYWORDS
+from .ticker_resolver import get_default_resolver, spoken_numbers
+
+NUMBER_WORDS = [
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen",
+    "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety",
+    "hundred", "thousand", "million", "billion", "oh",
+    "first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth", "tenth",
+    "eleventh", "twelfth", "thirteenth", "fourteenth", "fifteenth", "sixteenth", "seventeenth",
+    "eighteenth", "nineteenth", "twentieth", "thirtieth",
+]
+MONTH_WORDS = [
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december",
+]
+# Words that glue a finance question together
+QUESTION_WORDS = [
+    "what", "what's", "whats", "is", "are", "was", "were", "the", "of", "for", "in", "on", "at", "to",
+    "how", "much", "many", "did", "does", "do", "show", "me", "tell", "give", "about", "who", "which",
+    "a", "an", "and", "its", "their", "this", "last", "next", "previous", "current", "year", "years",
+    "ago", "quarter", "fiscal", "today", "now", "latest", "please", "company", "companies", "stock",
+    "shares", "share", "per", "ceo", "pay", "paid", "make", "made", "earn", "earned", "spend", "spent",
+]
+
+
+def _words(phrase):
+    # Digits become number words ("3m" -> "three m"); Vosk cannot emit digits
+    return re.findall(r"[a-z']+", spoken_numbers(phrase.lower()))
+
+
+def build_finance_grammar(resolver=None):
+    """
+    Build the phrase list for grammar-constrained Vosk recognition.
+
+    Contains company names and brand aliases (numbers spelled as words, "three m"),
+    tickers spelled letter by letter ("a a p l", mapped back by
+    TickerResolver.find_in_text), every intent and metric keyword, number/ordinal/month words for
+    amounts, years and dates, and the connective words of typical questions.
+
+    Returns:
+        list of str: Lower-case phrases, without duplicates.
+    """
+    resolver = resolver or get_default_resolver()
+    phrases = []
+    seen = set()
+
+    def add(phrase):
+        phrase = " ".join(_words(phrase))
+        if phrase and phrase not in seen:
+            seen.add(phrase)
+            phrases.append(phrase)
+
+    for name in resolver.text_aliases:
+        add(name)
+    for ticker in resolver.tickers:
+        add(" ".join(ticker.lower()))
+    for table in (INTENT_KEYWORDS, METRIC_KEYWORDS):
+        for keywords in table.values():
+            for keyword in keywords:
+                add(keyword)
+    for word in NUMBER_WORDS + MONTH_WORDS + QUESTION_WORDS:
+        add(word)
+    return phrases
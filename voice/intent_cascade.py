@@ -0,0 +1,161 @@
+# voice/intent_cascade.py
+import os
+import re
+import threading
+import time
+from .entity_extractor import DATE_PATTERNS, RELATIVE_YEAR_PATTERN, YEAR_PATTERN, YEARS_AGO_PATTERN
+from .keyword_matcher import DATED_INTENTS, METRIC_INTENTS, METRIC_MATCHER
+
+TIME_PATTERNS = DATE_PATTERNS + [YEAR_PATTERN, RELATIVE_YEAR_PATTERN, YEARS_AGO_PATTERN]
+
+
+class IntentCascade:
+    """
+    Two-tier intent classification: compiled keyword rules first, the
+    zero-shot model only when the rules are not confident.
+
+    Keyword confidence is the share of the winning intent among all matched
+    intents, halved when the winning keyword is a generic word that also
+    appears inside another intent's keywords (e.g. "price", "income").
+    Matches are taken from the shared KeywordMatcher, which already drops a
+    keyword overlapped by a longer one, so "historical stock price" does not
+    also count as "stock price".
+
+    Confidence is capped at half the threshold, so the model decides, when
+    the question contradicts the winning intent: a metric keyword longer than
+    the intent keyword belongs to another intent ("cost of revenue" against
+    "revenue"), or a date or year turns it into another intent ("share price
+    in January 2020" is historical).
+    """
+
+    def __init__(self, matcher, model_fn, threshold=None, model_batch_fn=None):
+        """
+        Args:
+            matcher (KeywordMatcher): Compiled intent keyword table.
+            model_fn (callable): text -> intent, the expensive fallback tier.
+            model_batch_fn (callable, optional): list of texts -> list of intents,
+                used by classify_batch. Defaults to calling model_fn per text.
+            threshold (float, optional): Minimum keyword confidence to skip the model.
+                Defaults to INTENT_CASCADE_THRESHOLD or 0.75.
+        """
+        self.matcher = matcher
+        self.model_fn = model_fn
+        self.model_batch_fn = model_batch_fn
+        self.threshold = threshold if threshold is not None else float(os.getenv("INTENT_CASCADE_THRESHOLD", "0.75"))
+        self.generic = set()
+        for keyword, intent in matcher.keyword_to_label.items():
+            others = [k for k, i in matcher.keyword_to_label.items() if i != intent]
+            if any(re.search(rf"\b{re.escape(keyword)}\b", other) for other in others):
+                self.generic.add(keyword)
+        self._lock = threading.Lock()
+        self._stats = {tier: {"count": 0, "total_ms": 0.0} for tier in ("keyword", "model")}
+        self._calls = 0
+
+    def keyword_stage(self, text):
+        """
+        Return (intent, confidence) from the keyword rules; (None, 0.0) when nothing matches.
+        """
+        matches = self.matcher.matches(text)
+        if not matches:
+            return None, 0.0
+
+        best = {}
+        for start, end, intent, keyword in matches:
+            if intent not in best or len(keyword) > len(best[intent]):
+                best[intent] = keyword
+        ranked = sorted(best.items(), key=lambda item: (-len(item[1]), self.matcher.priority[item[0]]))
+        intent, keyword = ranked[0]
+        share = len(keyword) / sum(len(k) for _, k in ranked)
+        specificity = 0.5 if keyword in self.generic else 1.0
+        confidence = share * specificity
+        if self.contradicted(text, intent, keyword):
+            confidence = min(confidence, self.threshold / 2)
+        return intent, confidence
+
+    def contradicted(self, text, intent, keyword):
+        """
+        Return True if a longer metric keyword or a date in the text points to an intent other than intent.
+        """
+        for start, end, metric, metric_keyword in METRIC_MATCHER.matches(text):
+            if len(metric_keyword) > len(keyword) and METRIC_INTENTS.get(metric, intent) != intent:
+                return True
+        if intent in DATED_INTENTS:
+            return any(pattern.search(text) for pattern in TIME_PATTERNS)
+        return False
+
+    def classify(self, text):
+        """
+        Classify text, calling the model tier only when keyword confidence is below the threshold.
+        """
+        start = time.perf_counter()
+        intent, confidence = self.keyword_stage(text)
+        keyword_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._calls += 1
+            self._stats["keyword"]["total_ms"] += keyword_ms
+        if intent and confidence >= self.threshold:
+            with self._lock:
+                self._stats["keyword"]["count"] += 1
+            print(f"Classified intent: {intent} by keywords (confidence {confidence:.2f})")
+            return intent
+
+        start = time.perf_counter()
+        intent = self.model_fn(text)
+        model_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats["model"]["count"] += 1
+            self._stats["model"]["total_ms"] += model_ms
+        return intent
+
+    def classify_batch(self, texts):
+        """
+        Classify many texts; those the keyword rules are unsure about go to the model in one batch.
+        """
+        results = [None] * len(texts)
+        unsure = []
+        start = time.perf_counter()
+        for i, text in enumerate(texts):
+            intent, confidence = self.keyword_stage(text)
+            if intent and confidence >= self.threshold:
+                results[i] = intent
+            else:
+                unsure.append(i)
+        keyword_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._calls += len(texts)
+            self._stats["keyword"]["count"] += len(texts) - len(unsure)
+            self._stats["keyword"]["total_ms"] += keyword_ms
+
+        if unsure:
+            start = time.perf_counter()
+            pending = [texts[i] for i in unsure]
+            if self.model_batch_fn is not None:
+                intents = self.model_batch_fn(pending)
+            else:
+                intents = [self.model_fn(text) for text in pending]
+            model_ms = (time.perf_counter() - start) * 1000
+            for i, intent in zip(unsure, intents):
+                results[i] = intent
+            with self._lock:
+                self._stats["model"]["count"] += len(unsure)
+                self._stats["model"]["total_ms"] += model_ms
+        return results
+
+    def stats(self):
+        """
+        Report the share of traffic each tier answered and the latency it adds.
+
+        The keyword tier runs for every call, so its average latency is over all
+        calls; the model tier's average is over the calls that reached it.
+        """
+        with self._lock:
+            calls = self._calls
+            report = {"calls": calls, "threshold": self.threshold}
+            for tier, values in self._stats.items():
+                runs = calls if tier == "keyword" else values["count"]
+                report[tier] = {
+                    "answered": values["count"],
+                    "fraction": round(values["count"] / calls, 4) if calls else 0.0,
+                    "avg_ms": round(values["total_ms"] / runs, 3) if runs else 0.0,
+                }
+        return report
@@ -0,0 +1,131 @@
+# voice/keyword_matcher.py
+import re
+
+# Keyword tables shared by IntentClassifier and TextClassifier. Label order is
+# the priority used to break ties between equally long matches.
+INTENT_KEYWORDS = {
+    "get_net_income": ["net income", "income", "earnings", "earn", "earned"],
+    "get_revenue": ["revenue", "sales", "turnover", "gross income"],
+    "get_stock_price": ["stock price", "stock", "price", "share price", "current price", "price now", "stock value"],
+    "get_profit_margin": ["profit margin", "margin", "profit percentage", "net margin", "profit"],
+    "get_company_profile": ["who is", "company profile", "about company", "company info"],
+    "get_market_cap": ["market cap", "market capitalization", "company value", "valuation"],
+    "get_historical_stock_price": ["historical stock price", "stock price on", "past stock price", "stock price in", "price on"],
+    "get_dividend_info": ["dividend info", "dividend payout", "payout ratio", "dividend yield", "dividend"],
+    "get_balance_sheet": ["balance sheet", "sheet", "financial position", "assets and liabilities", "balance"],
+    "get_cash_flow": ["cash", "flow", "cash flow", "cashflow", "cash from operations", "operating cash"],
+    "get_financial_ratios": ["financial ratios", "ratios", "current ratio", "liquidity ratio", "debt ratio"],
+    "get_earnings_per_share": ["earnings per share", "eps", "per share earnings", "earn per share"],
+    "get_interest": ["interest expense", "interest payment", "interest cost", "interest"],
+    "get_research_info": ["research and development", "r&d", "research"],
+    "get_cost_info": ["total cost", "operating expense", "cost"],
+    "get_income_tax": ["income tax", "tax expense", "tax rate", "tax"],
+}
+
+# Keyword -> metric name used for CSV/SQL lookups
+METRIC_KEYWORDS = {
+    "netIncome": ["net income", "net", "income"],
+    "revenue": ["revenue"],
+    "netProfitMargin": ["net profit margin", "net margin", "profit margin", "profit", "margin"],
+    "mktCap": ["market cap", "market capitalization", "market"],
+    "payoutRatio": ["payout ratio", "dividend payout"],
+    "currentRatio": ["current ratio", "liquidity ratio"],
+    "eps": ["eps", "earnings per share", "earnings"],
+    "price": ["stock", "stock price", "current price", "valuation", "price"],
+    "ceo": ["company info", "about company", "who is"],
+    "Assets&Liabilities": ["balance sheet", "sheet", "assets"],
+    "historical": ["historical"],
+    "cashFlowFromOperatingActivities": ["cash", "flow", "cash flow"],
+    "IncomeTax": ["income tax", "tax"],
+    "InterestExpense": ["interest", "interest expense", "expense"],
+    "Research": ["research and development", "research development", "r&d", "research", "development"],
+    "TotalCost": ["cost", "total cost", "cost of revenue"],
+}
+
+# Metric -> the intent that answers it, so a metric keyword can contradict an intent match
+METRIC_INTENTS = {
+    "netIncome": "get_net_income",
+    "revenue": "get_revenue",
+    "netProfitMargin": "get_profit_margin",
+    "mktCap": "get_market_cap",
+    "payoutRatio": "get_dividend_info",
+    "currentRatio": "get_financial_ratios",
+    "eps": "get_earnings_per_share",
+    "price": "get_stock_price",
+    "ceo": "get_company_profile",
+    "Assets&Liabilities": "get_balance_sheet",
+    "historical": "get_historical_stock_price",
+    "cashFlowFromOperatingActivities": "get_cash_flow",
+    "IncomeTax": "get_income_tax",
+    "InterestExpense": "get_interest",
+    "Research": "get_research_info",
+    "TotalCost": "get_cost_info",
+}
+
+# Intent -> the intent it becomes when the question names a date or year
+DATED_INTENTS = {
+    "get_stock_price": "get_historical_stock_price",
+}
+
+
+class KeywordMatcher:
+    """
+    Find every keyword of a label -> keywords table in one pass over the text.
+
+    All keywords are compiled into a single alternation regex wrapped in a
+    lookahead, so each position reports its longest keyword and overlapping
+    matches are not consumed. Keywords match whole words, with an optional
+    plural "s"/"es". Conflicts are resolved by longest match first, then by
+    the label's position in the table, which makes the result independent of
+    keyword order.
+    """
+
+    def __init__(self, table):
+        """
+        Args:
+            table (dict): label -> list of keywords. Earlier labels win ties, and a
+                keyword listed under several labels belongs to the first one.
+        """
+        self.table = table
+        self.keyword_to_label = {}
+        self.priority = {}
+        for rank, (label, keywords) in enumerate(table.items()):
+            self.priority[label] = rank
+            for keyword in keywords:
+                self.keyword_to_label.setdefault(keyword.lower(), label)
+        alternation = "|".join(re.escape(k) for k in sorted(self.keyword_to_label, key=len, reverse=True))
+        self.pattern = re.compile(rf"(?=\b(({alternation})(?:e?s)?)\b)")
+
+    def find_all(self, text):
+        """
+        Return every (start, end, label, keyword) match, in text order.
+        """
+        found = []
+        for m in self.pattern.finditer(text.lower()):
+            keyword = m.group(2)
+            found.append((m.start(), m.start() + len(m.group(1)), self.keyword_to_label[keyword], keyword))
+        return found
+
+    def matches(self, text):
+        """
+        Return non-overlapping matches chosen longest first, then by label priority.
+        """
+        ranked = sorted(self.find_all(text), key=lambda m: (m[0] - m[1], self.priority[m[2]], m[0]))
+        chosen = []
+        for match in ranked:
+            if all(match[1] <= other[0] or other[1] <= match[0] for other in chosen):
+                chosen.append(match)
+        return sorted(chosen)
+
+    def best(self, text):
+        """
+        Return the label of the longest (then highest-priority) match, or None.
+        """
+        found = self.find_all(text)
+        if not found:
+            return None
+        return min(found, key=lambda m: (m[0] - m[1], self.priority[m[2]], m[0]))[2]
+
+
+INTENT_MATCHER = KeywordMatcher(INTENT_KEYWORDS)
+METRIC_MATCHER = KeywordMatcher(METRIC_KEYWORDS)
@@ -4,12 +4,100 @@ import vosk
 # import pyaudio
 import io
 import json
+import os
+import threading
 from vosk import Model, KaldiRecognizer
+from .vad import speech_segments
+
+class StreamingTranscriber:
+    """
+    Incremental recognition over raw PCM chunks for one client stream.
+
+    Feed 16-bit mono PCM as it arrives; each chunk yields either a partial
+    hypothesis for the utterance in progress or the final text of an
+    utterance Kaldi has just closed. ``finish`` flushes the last utterance and
+    returns the whole transcript.
+    """
+
+    def __init__(self, model, sample_rate=16000):
+        self.sample_rate = sample_rate
+        self.recognizer = KaldiRecognizer(model, sample_rate)
+        self.segments = []
+
+    def accept(self, pcm):
+        """
+        Feed a chunk of s16le PCM.
+
+        Returns:
+            tuple: ("final", text) when an utterance ended, else ("partial", text).
+        """
+        if self.recognizer.AcceptWaveform(pcm):
+            text = json.loads(self.recognizer.Result()).get("text", "")
+            if text:
+                self.segments.append(text)
+            return "final", text
+        return "partial", json.loads(self.recognizer.PartialResult()).get("partial", "")
+
+    def finish(self):
+        """
+        Flush the recognizer and return the full transcript.
+        """
+        text = json.loads(self.recognizer.FinalResult()).get("text", "")
+        if text:
+            self.segments.append(text)
+        return " ".join(self.segments)
+
 
 class SpeechToText:
-    def __init__(self, model_path):
+    def __init__(self, model_path, grammar=None, min_confidence=None, vad=None):
+        """
+        Args:
+            model_path (str): Path to the Vosk model directory.
+            grammar (list of str, optional): Phrase list for constrained decoding
+                (see voice.finance_grammar). Without it only the open vocabulary is used.
+            min_confidence (float, optional): Mean word confidence below which a
+                constrained result is discarded and the audio is decoded again with the
+                open vocabulary. Defaults to STT_GRAMMAR_MIN_CONFIDENCE or 0.6.
+            vad (bool, optional): Trim silence and decode only speech segments.
+                Defaults to STT_VAD (on).
+        """
         self.model = vosk.Model(model_path)
         self.sample_rate = 16000
+        # "[unk]" lets the constrained decoder emit out-of-grammar words instead of forcing a phrase
+        self.grammar = json.dumps(list(grammar) + ["[unk]"]) if grammar else None
+        self.min_confidence = min_confidence if min_confidence is not None else float(os.getenv("STT_GRAMMAR_MIN_CONFIDENCE", "0.6"))
+        self.grammar_stats = {"constrained": 0, "fallbacks": 0}
+        self.vad = vad if vad is not None else os.getenv("STT_VAD", "1").lower() not in ("0", "false", "no")
+        self.vad_stats = {"audio_seconds": 0.0, "speech_seconds": 0.0, "segments": 0}
+        self._stats_lock = threading.Lock()
+        # One recognizer per thread, sample rate and mode, reused across files
+        self._local = threading.local()
+
+    def recognizer(self, sample_rate, constrained=False):
+        """
+        Return this thread's recognizer for a sample rate, reset and ready for a new file.
+        """
+        recognizers = getattr(self._local, "recognizers", None)
+        if recognizers is None:
+            recognizers = self._local.recognizers = {}
+        key = (sample_rate, constrained)
+        rec = recognizers.get(key)
+        if rec is None:
+            if constrained:
+                rec = KaldiRecognizer(self.model, sample_rate, self.grammar)
+                rec.SetWords(True)
+            else:
+                rec = KaldiRecognizer(self.model, sample_rate)
+            recognizers[key] = rec
+        else:
+            rec.Reset()
+        return rec
+
+    def stream(self, sample_rate=16000):
+        """
+        Start an incremental transcription session that shares this model.
+        """
+        return StreamingTranscriber(self.model, sample_rate)
 
     def listen(self, duration=10, sample_rate=16000):
         p = pyaudio.PyAudio()
@@ -46,6 +134,76 @@ class SpeechToText:
         result = json.loads(rec.FinalResult())
         return result.get("text", "")
 
+    def decode_pcm(self, pcm, sample_rate=16000, constrained=False, chunk_bytes=8000):
+        """
+        Decode PCM with one recognizer and return (text, mean word confidence).
+
+        Confidence is only reported for constrained decoding (word timings are
+        enabled there); the open-vocabulary pass returns None.
+        """
+        rec = self.recognizer(sample_rate, constrained)
+        results = []
+        view = memoryview(pcm)
+        for start in range(0, len(view), chunk_bytes):
+            if rec.AcceptWaveform(bytes(view[start:start + chunk_bytes])):
+                results.append(json.loads(rec.Result()))
+        results.append(json.loads(rec.FinalResult()))
+        text = " ".join(result.get("text", "") for result in results if result.get("text"))
+        words = [word for result in results for word in result.get("result", [])]
+        confidence = sum(word.get("conf", 0.0) for word in words) / len(words) if words else None
+        return text, confidence
+
+    def _transcribe_segment(self, pcm, sample_rate):
+        if self.grammar:
+            text, confidence = self.decode_pcm(pcm, sample_rate, constrained=True)
+            with self._stats_lock:
+                self.grammar_stats["constrained"] += 1
+            if text and "[unk]" not in text and (confidence or 0.0) >= self.min_confidence:
+                return text
+            with self._stats_lock:
+                self.grammar_stats["fallbacks"] += 1
+        text, _ = self.decode_pcm(pcm, sample_rate)
+        return text
+
+    def transcribe_pcm(self, pcm, sample_rate=16000):
+        """
+        Transcribe raw 16-bit mono PCM held in memory.
+
+        With VAD on, leading/trailing silence is trimmed and the audio is split
+        into speech segments that are decoded in order and joined, so decode time
+        follows the amount of speech rather than the recording length. With a
+        grammar, each segment is decoded with the finance-constrained recognizer
+        first and again with the open vocabulary if that result is empty, has
+        out-of-grammar words or a mean confidence below ``min_confidence``.
+
+        Args:
+            pcm (bytes): s16le samples, e.g. from voice.audio_decode.
+            sample_rate (int): Sample rate of ``pcm``.
+
+        Returns:
+            str: The recognized text, or None if recognition fails.
+        """
+        try:
+            if self.vad:
+                segments = speech_segments(pcm, sample_rate)
+                with self._stats_lock:
+                    self.vad_stats["audio_seconds"] += len(pcm) / 2 / sample_rate
+                    self.vad_stats["speech_seconds"] += sum(end - start for start, end in segments) / 2 / sample_rate
+                    self.vad_stats["segments"] += len(segments)
+                if not segments:
+                    print("No speech detected.")
+                    return ""
+            else:
+                segments = [(0, len(pcm))]
+
+            texts = [self._transcribe_segment(pcm[start:end], sample_rate) for start, end in segments]
+            text = " ".join(t for t in texts if t)
+            print(f"Recognized text: {text}")
+            return text
+        except Exception as e:
+            print(f"Error processing audio: {e}")
+            return None
+
     def transcribe_audio(self, audio_file):
         """
         Process an audio file and convert speech to text using Vosk.
@@ -57,27 +215,15 @@ class SpeechToText:
             str: The recognized text, or None if recognition fails.
         """
         try:
-            wf = wave.open(audio_file, "rb")
-            if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() not in [8000, 16000, 32000, 44100, 48000]:
-                print("Audio file must be WAV format, mono, 16-bit, with a supported sample rate.")
-                return None
-
-            rec = KaldiRecognizer(self.model, wf.getframerate())
+            with wave.open(audio_file, "rb") as wf:
+                if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() not in [8000, 16000, 32000, 44100, 48000]:
+                    print("Audio file must be WAV format, mono, 16-bit, with a supported sample rate.")
+                    return None
+                sample_rate = wf.getframerate()
+                pcm = wf.readframes(wf.getnframes())
             print("Processing audio with Vosk...")
-
-            while True:
-                data = wf.readframes(4000)
-                if len(data) == 0:
-                    break
-                if rec.AcceptWaveform(data):
-                    result = json.loads(rec.Result())
-                    return result.get("text", "")
-
-            final_result = json.loads(rec.FinalResult())
-            text = final_result.get("text", "")
-            print(f"Recognized text: {text}")
-            return text
+            return self.transcribe_pcm(pcm, sample_rate)
 
         except Exception as e:
             print(f"Error processing audio: {e}")
-            return None
\ No newline at end of file
+            return None
@@ -0,0 +1,294 @@
+# voice/ticker_resolver.py
+import heapq
+import os
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from functools import lru_cache
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+DEFAULT_SOURCES = [
+    os.path.join(DATA_DIR, "financial_data.csv"),
+    os.path.join(DATA_DIR, "financial data sp500 companies.csv"),
+]
+
+# Brand names that cannot be derived from the firm column
+BRAND_ALIASES = {
+    "google": "GOOGL",
+    "alphabet": "GOOGL",
+    "facebook": "META",
+    "meta": "META",
+    "berkshire": "BRK-B",
+    "berkshire hathaway": "BRK-B",
+}
+
+# Legal-form words dropped when normalizing company names
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "companies",
+    "ltd", "limited", "plc", "llc", "lp", "group", "holdings", "holding", "the",
+}
+
+# Single-word names that are also everyday words; ignored when scanning free text
+COMMON_WORDS = {
+    "target", "match", "ball", "news", "price", "general", "best", "public", "global",
+    "first", "state", "southern", "united", "american", "national", "international",
+    "equity", "block", "gap", "cash", "stock", "share", "market", "income", "revenue",
+    "progressive", "principal", "regions", "republic", "fox", "snap",
+    # Tickers that are also English words ("what is ALL the revenue")
+    "a", "all", "are", "has", "it", "key", "low", "now", "see", "so", "well", "fast", "cost", "info",
+}
+
+SMALL_NUMBER_WORDS = [
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen",
+]
+TENS_WORDS = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+
+
+def _number_words(digits):
+    if len(digits) > 2 or (len(digits) == 2 and digits[0] == "0"):
+        return " ".join(SMALL_NUMBER_WORDS[int(d)] for d in digits)
+    number = int(digits)
+    if number < 20:
+        return SMALL_NUMBER_WORDS[number]
+    return TENS_WORDS[number // 10] + (f" {SMALL_NUMBER_WORDS[number % 10]}" if number % 10 else "")
+
+
+def spoken_numbers(text):
+    """
+    Write the numbers in a name as a recognizer transcribes them ("3m" -> "three m",
+    "phillips 66" -> "phillips sixty six").
+    """
+    return " ".join(re.sub(r"\d+", lambda m: f" {_number_words(m.group())} ", text).split())
+
+
+def normalize_name(name):
+    """
+    Lowercase a company name and strip parentheticals, punctuation and legal suffixes.
+    """
+    text = str(name).lower()
+    text = re.sub(r"\([^)]*\)", " ", text)
+    text = re.sub(r"'s\b", "", text)
+    text = re.sub(r"[^a-z0-9&]+", " ", text)
+    words = [w for w in text.split() if w not in LEGAL_SUFFIXES]
+    return " ".join(words)
+
+
+class TickerResolver:
+    """
+    Resolve company names and ticker symbols to tickers.
+
+    Exact names, normalized names, ticker symbols and brand aliases go into a
+    dict. Anything else is resolved by candidate generation over a character
+    trigram inverted index, followed by a SequenceMatcher rerank of the few
+    best candidates, so a lookup never scans the full company list.
+    """
+
+    def __init__(self, companies, aliases=None, candidates=5):
+        """
+        Args:
+            companies (iterable of (str, str)): (firm name, ticker) pairs.
+            aliases (dict, optional): Extra alias -> ticker entries.
+            candidates (int): Number of n-gram candidates passed to the rerank step.
+        """
+        self.candidates = candidates
+        self.gram_counts = []    # number of distinct trigrams of each name
+        self.names = []          # normalized names, indexed by id
+        self.firms = []          # display firm name for each id
+        self.name_tickers = []   # ticker for each id
+        self.alias_to_ticker = {}
+        self.text_aliases = {}   # name aliases safe to match in free text (no bare tickers)
+        self.ticker_to_firm = {}
+        self.tickers = set()
+        self.spelled_tickers = {}  # letters of a ticker ("AAPL", "BRKB") -> ticker, for spelled-out speech
+        self._postings = defaultdict(list)
+        self._word_prefixes = defaultdict(list)  # first 3 letters of each name word -> ids
+
+        for firm, ticker in companies:
+            if not isinstance(ticker, str) or not ticker:
+                continue
+            firm = str(firm)
+            self.tickers.add(ticker.upper())
+            self.spelled_tickers.setdefault(re.sub(r"[^A-Z]", "", ticker.upper()), ticker.upper())
+            self.ticker_to_firm.setdefault(ticker.upper(), firm)
+            normalized = normalize_name(firm)
+            for alias in (ticker.lower(), firm.lower(), normalized):
+                if alias:
+                    # First source wins on collisions (e.g. both Alphabet share classes)
+                    self.alias_to_ticker.setdefault(alias, ticker.upper())
+            if normalized and normalized not in COMMON_WORDS:
+                self.text_aliases.setdefault(normalized, ticker.upper())
+                spoken = spoken_numbers(normalized)
+                if spoken != normalized:
+                    self.alias_to_ticker.setdefault(spoken, ticker.upper())
+                    self.text_aliases.setdefault(spoken, ticker.upper())
+            if normalized and normalized not in self.names:
+                name_id = len(self.names)
+                self.names.append(normalized)
+                self.firms.append(firm)
+                self.name_tickers.append(ticker.upper())
+                grams = set(self._ngrams(normalized))
+                self.gram_counts.append(len(grams))
+                for gram in grams:
+                    self._postings[gram].append(name_id)
+                for prefix in {word[:3] for word in normalized.split()}:
+                    self._word_prefixes[prefix].append(name_id)
+
+        for alias, ticker in (aliases if aliases is not None else BRAND_ALIASES).items():
+            self.alias_to_ticker[alias] = ticker
+            self.text_aliases[alias] = ticker
+            self.spelled_tickers.setdefault(re.sub(r"[^A-Z]", "", ticker.upper()), ticker.upper())
+
+        # Longest alias first when scanning free text
+        self.max_alias_words = max((len(a.split()) for a in self.text_aliases), default=1)
+
+    @classmethod
+    def from_csvs(cls, paths=None, **kwargs):
+        """
+        Build a resolver from the firm/Ticker columns of one or more CSV files.
+        """
+        companies = []
+        for path in paths or DEFAULT_SOURCES:
+            try:
+                df = pd.read_csv(path, usecols=["firm", "Ticker"])
+            except Exception as e:
+                print(f"Error reading companies from {path}: {e}")
+                continue
+            companies.extend(df.drop_duplicates().itertuples(index=False, name=None))
+        return cls(companies, **kwargs)
+
+    @staticmethod
+    def _ngrams(text, n=3):
+        padded = f"  {text} "
+        return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+    def resolve(self, name, k=5, min_score=0.5):
+        """
+        Return the top-k (ticker, firm, score) matches for a company name or ticker.
+
+        Args:
+            name (str): Company name, brand or ticker symbol.
+            k (int): Maximum number of matches.
+            min_score (float): Minimum similarity in [0, 1].
+
+        Returns:
+            list of tuple: (ticker, firm, score), best first.
+        """
+        if not name:
+            return []
+        raw = str(name).strip().lower()
+        for key in (raw, normalize_name(raw)):
+            ticker = self.alias_to_ticker.get(key)
+            if ticker:
+                return [(ticker, self.ticker_to_firm.get(ticker, ticker), 1.0)]
+
+        normalized = normalize_name(raw)
+        if not normalized:
+            return []
+        grams = set(self._ngrams(normalized))
+        counts = Counter()
+        for gram in grams:
+            counts.update(self._postings.get(gram, ()))
+        # Candidate step: trigram Dice coefficient straight from the posting counts
+        candidates = heapq.nlargest(
+            self.candidates,
+            counts,
+            key=lambda name_id: 2 * counts[name_id] / (len(grams) + self.gram_counts[name_id]),
+        )
+        # Names with a word starting with a query word ("exxon" -> "exxonmobil") are always reranked
+        words = [w for w in normalized.split() if len(w) >= 3]
+        for word in words:
+            for name_id in self._word_prefixes.get(word[:3], ()):
+                if name_id not in candidates and any(w.startswith(word) for w in self.names[name_id].split()):
+                    candidates.append(name_id)
+        scored = []
+        for name_id in candidates:
+            score = self._rerank_score(normalized, self.names[name_id])
+            if score >= min_score:
+                scored.append((self.name_tickers[name_id], self.firms[name_id], score))
+        scored.sort(key=lambda match: match[2], reverse=True)
+        return scored[:k]
+
+    @staticmethod
+    def _rerank_score(query, name):
+        """
+        Similarity of a normalized query and company name in [0, 1].
+
+        A query whose words each start a word of the name scores at least 0.75
+        (0.8 when it starts the name), rising with how much of the name it
+        covers, so "exxon" ranks ExxonMobil above the character-wise closer
+        Exelon. Otherwise the SequenceMatcher ratio is used.
+        """
+        score = SequenceMatcher(None, query, name).ratio()
+        query_words = query.split()
+        name_words = name.split()
+        if all(len(q) >= 3 and any(w.startswith(q) for w in name_words) for q in query_words):
+            base = 0.8 if name.startswith(query) else 0.75
+            score = max(score, base + 0.2 * len(query) / max(len(name), 1))
+        return score
+
+    def best(self, name, min_score=0.5):
+        """
+        Return the best (ticker, firm, score) match or None.
+        """
+        matches = self.resolve(name, k=1, min_score=min_score)
+        return matches[0] if matches else None
+
+    def find_in_text(self, text):
+        """
+        Find a company mentioned in free text via the exact alias table.
+
+        Company names are matched first, as whole (possibly multi-word) phrases,
+        longest first, then tickers spelled out letter by letter ("a a p l", as
+        the finance grammar transcribes them). Only if neither matches are
+        upper-case tokens of two or more letters taken as ticker symbols, and
+        never when the whole text is upper case or the token is an everyday word
+        ("IT", "ALL"). Bare lower-case tickers are ignored because they are too
+        ambiguous in prose. Returns the ticker or None.
+        """
+        if not text:
+            return None
+        words = normalize_name(text).split()
+        for size in range(min(self.max_alias_words, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                ticker = self.text_aliases.get(" ".join(words[start:start + size]))
+                if ticker:
+                    return ticker
+        ticker = self._find_spelled(words)
+        if ticker:
+            return ticker
+        if not re.search(r"[a-z]", text):
+            return None
+        for token in re.findall(r"\b[A-Z]{2,5}\b", text):
+            if token in self.tickers and token.lower() not in COMMON_WORDS:
+                return token
+        return None
+
+    def _find_spelled(self, words):
+        """
+        Return the ticker spelled by a run of two or more single letters, longest first.
+        """
+        runs, run = [], []
+        for word in words + [""]:
+            if len(word) == 1 and word.isalpha():
+                run.append(word.upper())
+            else:
+                if len(run) >= 2:
+                    runs.append(run)
+                run = []
+        for run in runs:
+            for size in range(min(len(run), 5), 1, -1):
+                for start in range(len(run) - size + 1):
+                    ticker = self.spelled_tickers.get("".join(run[start:start + size]))
+                    if ticker:
+                        return ticker
+        return None
+
+
+@lru_cache(maxsize=1)
+def get_default_resolver():
+    """
+    Return the process-wide resolver built from the CSVs in data/.
+    """
+    return TickerResolver.from_csvs()
@@ -0,0 +1,112 @@
+# voice/transcription_service.py
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TranscriptionQueueFull(Exception):
+    """Raised when a transcription job waited too long for a free slot."""
+
+
+class TranscriptionService:
+    """
+    Run Vosk decoding off the event loop on a pool of worker threads.
+
+    All workers share the one loaded ``vosk.Model`` held by SpeechToText and
+    decode with their own recognizer (see SpeechToText.recognizer); Kaldi
+    releases the GIL while decoding, so concurrent uploads use several cores.
+    At most ``workers + queue_size`` jobs are admitted at once. Further
+    callers wait up to ``timeout`` seconds for a slot and then get
+    TranscriptionQueueFull, which the endpoints turn into a "busy" response
+    instead of piling up unbounded work.
+    """
+
+    def __init__(self, stt, workers=None, queue_size=None, timeout=None):
+        """
+        Args:
+            stt (SpeechToText): Loaded speech model shared by all workers.
+            workers (int, optional): Worker threads. Defaults to TRANSCRIBE_WORKERS or the CPU count.
+            queue_size (int, optional): Jobs allowed to wait for a worker.
+                Defaults to TRANSCRIBE_QUEUE_SIZE or 2 * workers.
+            timeout (float, optional): Seconds to wait for a slot. Defaults to TRANSCRIBE_QUEUE_TIMEOUT or 30.
+        """
+        self.stt = stt
+        self.workers = workers or int(os.getenv("TRANSCRIBE_WORKERS", str(os.cpu_count() or 1)))
+        self.queue_size = queue_size if queue_size is not None else int(os.getenv("TRANSCRIBE_QUEUE_SIZE", str(2 * self.workers)))
+        self.timeout = timeout if timeout is not None else float(os.getenv("TRANSCRIBE_QUEUE_TIMEOUT", "30"))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="vosk")
+        self._slots = {}  # event loop -> asyncio.Semaphore; a semaphore is bound to one loop
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0,
+                       "in_flight": 0, "wait_ms": 0.0, "run_ms": 0.0}
+
+    def _slots_for_loop(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            slots = self._slots.get(loop)
+            if slots is None:
+                slots = asyncio.Semaphore(self.workers + self.queue_size)
+                self._slots[loop] = slots
+            return slots
+
+    async def submit(self, fn, *args):
+        """
+        Run ``fn(*args)`` on a worker thread once a queue slot is free and return its result.
+
+        Raises:
+            TranscriptionQueueFull: No slot became free within ``timeout`` seconds.
+        """
+        slots = self._slots_for_loop()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise TranscriptionQueueFull(f"Transcription queue is full ({self.workers} workers, {self.queue_size} queued).")
+
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["in_flight"] += 1
+            self._stats["wait_ms"] += (time.perf_counter() - start) * 1000
+        try:
+            run_start = time.perf_counter()
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+            with self._lock:
+                self._stats["completed"] += 1
+                self._stats["run_ms"] += (time.perf_counter() - run_start) * 1000
+            return result
+        except Exception:
+            with self._lock:
+                self._stats["failed"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._stats["in_flight"] -= 1
+            slots.release()
+
+    async def transcribe_file(self, audio_file):
+        """
+        Transcribe a WAV file on the pool. Returns the text or None, like SpeechToText.transcribe_audio.
+        """
+        return await self.submit(self.stt.transcribe_audio, audio_file)
+
+    async def transcribe_pcm(self, pcm, sample_rate=16000):
+        """
+        Transcribe in-memory s16le mono PCM on the pool.
+        """
+        return await self.submit(self.stt.transcribe_pcm, pcm, sample_rate)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["workers"] = self.workers
+        stats["queue_size"] = self.queue_size
+        stats["avg_wait_ms"] = round(stats.pop("wait_ms") / stats["submitted"], 3) if stats["submitted"] else 0.0
+        stats["avg_run_ms"] = round(stats.pop("run_ms") / stats["completed"], 3) if stats["completed"] else 0.0
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
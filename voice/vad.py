@@ -0,0 +1,88 @@
+# voice/vad.py
+import os
+import numpy as np
+
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "10"))
+VAD_FLOOR_DBFS = float(os.getenv("VAD_FLOOR_DBFS", "-50"))
+
+
+def frame_energies(samples, frame_samples):
+    """
+    Return the RMS level of each full frame in dBFS.
+    """
+    count = len(samples) // frame_samples
+    if count == 0:
+        return np.array([], dtype=np.float64)
+    frames = samples[:count * frame_samples].astype(np.float64).reshape(count, frame_samples)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1.0) / 32768.0)
+
+
+def speech_segments(pcm, sample_rate=16000, frame_ms=30, min_speech_ms=120, min_silence_ms=400, padding_ms=200,
+                    margin_db=None, floor_dbfs=None):
+    """
+    Find speech in 16-bit mono PCM with an adaptive energy threshold.
+
+    A frame is speech when it is ``margin_db`` above the recording's noise
+    floor (its 20th-percentile frame level), or within ``margin_db`` of its
+    loud frames if that is lower, and above ``floor_dbfs``. Pauses
+    shorter than ``min_silence_ms`` are bridged, bursts shorter than
+    ``min_speech_ms`` are dropped, and every segment is padded by
+    ``padding_ms`` so word onsets and releases are kept.
+
+    Args:
+        pcm (bytes): s16le samples.
+        sample_rate (int): Sample rate of ``pcm``.
+
+    Returns:
+        list of tuple: (start_byte, end_byte) ranges of speech, in order. Empty if
+        the audio holds no speech.
+    """
+    margin_db = VAD_MARGIN_DB if margin_db is None else margin_db
+    floor_dbfs = VAD_FLOOR_DBFS if floor_dbfs is None else floor_dbfs
+    samples = np.frombuffer(pcm, dtype="<i2", count=len(pcm) // 2)
+    frame_samples = max(1, int(sample_rate * frame_ms / 1000))
+    levels = frame_energies(samples, frame_samples)
+    if levels.size == 0:
+        return []
+
+    # Capped below the loud frames so a clip that is speech from end to end still passes
+    threshold = max(min(np.percentile(levels, 20) + margin_db, np.percentile(levels, 95) - margin_db), floor_dbfs)
+    voiced = levels > threshold
+
+    # Runs of voiced frames as [start, end) frame indexes
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced.astype(np.int8), [0]))))
+    runs = list(zip(edges[0::2], edges[1::2]))
+    if not runs:
+        return []
+
+    max_gap = max(1, min_silence_ms // frame_ms)
+    merged = [list(runs[0])]
+    for start, end in runs[1:]:
+        if start - merged[-1][1] < max_gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    min_frames = max(1, min_speech_ms // frame_ms)
+    pad = padding_ms // frame_ms
+    total_frames = len(levels)
+    segments = []
+    for start, end in merged:
+        if end - start < min_frames:
+            continue
+        start = max(0, start - pad)
+        end = min(total_frames, end + pad)
+        if segments and start <= segments[-1][1]:
+            segments[-1][1] = end
+        else:
+            segments.append([start, end])
+
+    frame_bytes = frame_samples * 2
+    last_byte = len(samples) * 2
+    result = []
+    for start, end in segments:
+        # The last segment keeps the partial frame at the end of the buffer
+        end_byte = last_byte if end == total_frames else int(end) * frame_bytes
+        result.append((int(start) * frame_bytes, end_byte))
+    return result